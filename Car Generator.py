@@ -1,30 +1,56 @@
 import random
 import os
+import argparse
+import hashlib
 from PIL import Image, ImageDraw
 
-def generate_car_image(direction, filename):
-    # Set the dimensions to match the player in the game (30x50)
-    width, height = 50, 30
-    image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
-    draw = ImageDraw.Draw(image)
+try:
+    import numpy as np
+except Exception:
+    np = None
 
+# Set the dimensions to match the player in the game (30x50)
+width, height = 50, 30
+
+# The whole design space: every sprite is one car type, one body colour,
+# three optional accessories and a paint style, facing left or right
+DIRECTIONS = ["right", "left"]
+CAR_TYPES = ["car", "truck", "bus"]  # Base type
+CAR_COLORS = [
+    (255, 0, 0, 255), (0, 0, 255, 255), (0, 255, 0, 255),
+    (255, 165, 0, 255), (128, 0, 128, 255), (0, 255, 255, 255)
+]  # Red, Blue, Green, Orange, Purple, Cyan
+PAINT_STYLES = ["solid", "striped", "double-striped"]
+
+# Parts in drawing order; later parts cover earlier ones. None means the
+# body colour of the sprite
+PARTS = ["body", "stripe", "stripe2", "roof", "windows", "wheels", "hubs", "spoiler", "shaker", "exhaust"]
+PART_COLORS = {
+    "body": None,
+    "stripe": (255, 255, 255, 255),  # White stripe
+    "stripe2": (255, 255, 255, 255),
+    "roof": None,
+    "windows": (135, 206, 250, 255),  # Light blue
+    "wheels": (0, 0, 0, 255),  # Black
+    "hubs": (220, 220, 220, 255),  # Dark gray
+    "spoiler": (50, 50, 50, 255),  # Dark gray
+    "shaker": (0, 0, 0, 255),  # Black
+    "exhaust": (169, 169, 169, 255),  # Gray
+}
+
+# Columns of a spec array (see random_car_specs / assemble_cars) and the
+# number of values each takes
+SPEC_FIELDS = ["type", "direction", "color", "spoiler", "shaker", "exhaust", "paint"]
+SPEC_SIZES = [len(CAR_TYPES), len(DIRECTIONS), len(CAR_COLORS), 2, 2, 2, len(PAINT_STYLES)]
+
+def car_part_shapes(car_type, direction):
+    """{part: [(shape, coords), ...]} for one car type and direction."""
     # Flip function for reversing coordinates for left-facing cars
     def flip_coords(x1, y1, x2=None, y2=None):
         if x2 is not None and y2 is not None:  # Rectangle or polygon
             return width - x2, y1, width - x1, y2
         return width - x1, y1  # Single point
 
-    # Randomize car type and features
-    car_type = random.choice(["car", "truck", "bus"])  # Base type
-    car_color = random.choice([ 
-        (255, 0, 0, 255), (0, 0, 255, 255), (0, 255, 0, 255), 
-        (255, 165, 0, 255), (128, 0, 128, 255), (0, 255, 255, 255)
-    ])  # Red, Blue, Green, Orange, Purple, Cyan
-    has_spoiler = random.choice([True, False])
-    has_shaker_hood = random.choice([True, False])
-    has_dual_exhaust = random.choice([True, False])
-    paint_style = random.choice(["solid", "striped", "double-striped"])
-
     # Set dimensions based on car type (scaled to fit 50x30 frame)
     if car_type == "truck":
         body_coords = (5, 10, 45, 20)  # Adjusted for truck body size
@@ -44,49 +70,37 @@ def generate_car_image(direction, filename):
     if direction == "left":
         body_coords = flip_coords(*body_coords)
 
-    # Draw the car body
-    draw.rectangle(body_coords, fill=car_color)
-
-    # Add paint jobs
-    if paint_style == "striped":
-        stripe_color = (255, 255, 255, 255)  # White stripe
-        stripe_coords = (body_coords[0] + 2, body_coords[1] + 2, body_coords[2] - 2, body_coords[1] + 5)
-        if direction == "left":
-            stripe_coords = flip_coords(*stripe_coords)
-        draw.rectangle(stripe_coords, fill=stripe_color)
-    elif paint_style == "double-striped":
-        stripe_color = (255, 255, 255, 255)  # White stripes
-        stripe1_coords = (body_coords[0] + 2, body_coords[1] + 2, body_coords[2] - 2, body_coords[1] + 5)
-        stripe2_coords = (body_coords[0] + 2, body_coords[1] + 10, body_coords[2] - 2, body_coords[1] + 13)
-        if direction == "left":
-            stripe1_coords = flip_coords(*stripe1_coords)
-            stripe2_coords = flip_coords(*stripe2_coords)
-        draw.rectangle(stripe1_coords, fill=stripe_color)
-        draw.rectangle(stripe2_coords, fill=stripe_color)
-
-    # Draw the car roof
+    shapes = {part: [] for part in PARTS}
+    shapes["body"].append(("rectangle", body_coords))
+
+    # Paint jobs
+    stripe1_coords = (body_coords[0] + 2, body_coords[1] + 2, body_coords[2] - 2, body_coords[1] + 5)
+    stripe2_coords = (body_coords[0] + 2, body_coords[1] + 10, body_coords[2] - 2, body_coords[1] + 13)
+    if direction == "left":
+        stripe1_coords = flip_coords(*stripe1_coords)
+        stripe2_coords = flip_coords(*stripe2_coords)
+    shapes["stripe"].append(("rectangle", stripe1_coords))
+    shapes["stripe2"].append(("rectangle", stripe2_coords))
+
+    # Car roof
     roof_coords = [(body_coords[0] + 5, body_coords[1] - roof_height),
                    (body_coords[2] - 5, body_coords[1] - roof_height),
                    (body_coords[2] - 4, body_coords[1]),
                    (body_coords[0] + 4, body_coords[1])]
     if direction == "left":
         roof_coords = [flip_coords(x, y) for x, y in roof_coords]
-    draw.polygon(roof_coords, fill=car_color)
+    shapes["roof"].append(("polygon", roof_coords))
 
-    # Draw windows
-    window_color = (135, 206, 250, 255)  # Light blue
+    # Windows
     window_coords = [
         (body_coords[0] + 6, body_coords[1] - roof_height + 3, body_coords[0] + 10, body_coords[1] - 1),
         (body_coords[2] - 10, body_coords[1] - roof_height + 3, body_coords[2] - 6, body_coords[1] - 1)
     ]
     if direction == "left":
         window_coords = [flip_coords(*coords) for coords in window_coords]
-    for coords in window_coords:
-        draw.rectangle(coords, fill=window_color)
+    shapes["windows"] += [("rectangle", coords) for coords in window_coords]
 
-    # Draw wheels (50% of wheel height above the car body)
-    wheel_color = (0, 0, 0, 255)  # Black
-    wheel_inner_color = (220, 220, 220, 255)  # Dark gray
+    # Wheels (50% of wheel height above the car body)
     wheel_radius = 4 if car_type != "car" else 3  # Larger wheels
     wheel_offset_x = 6  # Increased X offset to center wheels better
     wheel_offset_y = wheel_radius // 2  # 50% of wheel height above the car body
@@ -101,56 +115,258 @@ def generate_car_image(direction, filename):
     else:  # Bus
         wheels = [(body_coords[0] + 5, body_coords[3] - wheel_offset_y),  # Front wheel
                   (body_coords[2] - 5, body_coords[3] - wheel_offset_y)]  # Rear wheel
-    
+
     if direction == "left":
         wheels = [flip_coords(x, y) for x, y in wheels]
-    
-    # Draw the wheels
+
+    # The two wheels are far apart, so all tyres then all hubs draws the
+    # same pixels as tyre, hub, tyre, hub
     for x, y in wheels:
-        draw.ellipse((x - wheel_radius, y - wheel_radius, x + wheel_radius, y + wheel_radius), fill=wheel_color)
-        draw.ellipse((x - wheel_radius // 2, y - wheel_radius // 2, x + wheel_radius // 2, y + wheel_radius // 2), fill=wheel_inner_color)
-
-    # Add spoiler (optional)
-    if has_spoiler:
-        spoiler_color = (50, 50, 50, 255)  # Dark gray
-        spoiler_coords = [(body_coords[2] - 10, body_coords[1] - 4),
-                          (body_coords[2] - 5, body_coords[1] - 4),
-                          (body_coords[2] - 7, body_coords[1] - 2),
-                          (body_coords[2] - 8, body_coords[1] - 2)]
-        if direction == "left":
-            spoiler_coords = [flip_coords(x, y) for x, y in spoiler_coords]
-        draw.polygon(spoiler_coords, fill=spoiler_color)
-
-    # Add shaker hood (optional)
-    if has_shaker_hood:
-        shaker_color = (0, 0, 0, 255)  # Black
-        shaker_coords = (body_coords[0] + 4, body_coords[1] - 6, body_coords[0] + 6, body_coords[1] - 3)
-        if direction == "left":
-            shaker_coords = flip_coords(*shaker_coords)
-        draw.rectangle(shaker_coords, fill=shaker_color)
-
-    # Add dual side exhaust (optional)
-    if has_dual_exhaust:
-        exhaust_color = (169, 169, 169, 255)  # Gray
-        exhaust_coords = [
-            (body_coords[0] + 2, body_coords[1] + 2, body_coords[0] + 4, body_coords[1] + 4),
-            (body_coords[2] - 4, body_coords[1] + 2, body_coords[2] - 2, body_coords[1] + 4)
-        ]
-        if direction == "left":
-            exhaust_coords = [flip_coords(*coords) for coords in exhaust_coords]
-        for coords in exhaust_coords:
-            draw.rectangle(coords, fill=exhaust_color)
-
-    # Save the image
-    image.save(filename)
-
-# Create a folder for the cars
-output_folder = "cars"
-os.makedirs(output_folder, exist_ok=True)
-
-# Generate 50 right-facing cars and 50 left-facing cars
-for i in range(1, 51):
-    generate_car_image("right", os.path.join(output_folder, f"car_right_{i}.png"))
-    generate_car_image("left", os.path.join(output_folder, f"car_left_{i}.png"))
-
-print(f"100 car images saved to the '{output_folder}' folder.")
+        shapes["wheels"].append(("ellipse", (x - wheel_radius, y - wheel_radius, x + wheel_radius, y + wheel_radius)))
+        shapes["hubs"].append(("ellipse", (x - wheel_radius // 2, y - wheel_radius // 2,
+                                           x + wheel_radius // 2, y + wheel_radius // 2)))
+
+    # Spoiler (optional)
+    spoiler_coords = [(body_coords[2] - 10, body_coords[1] - 4),
+                      (body_coords[2] - 5, body_coords[1] - 4),
+                      (body_coords[2] - 7, body_coords[1] - 2),
+                      (body_coords[2] - 8, body_coords[1] - 2)]
+    if direction == "left":
+        spoiler_coords = [flip_coords(x, y) for x, y in spoiler_coords]
+    shapes["spoiler"].append(("polygon", spoiler_coords))
+
+    # Shaker hood (optional)
+    shaker_coords = (body_coords[0] + 4, body_coords[1] - 6, body_coords[0] + 6, body_coords[1] - 3)
+    if direction == "left":
+        shaker_coords = flip_coords(*shaker_coords)
+    shapes["shaker"].append(("rectangle", shaker_coords))
+
+    # Dual side exhaust (optional)
+    exhaust_coords = [
+        (body_coords[0] + 2, body_coords[1] + 2, body_coords[0] + 4, body_coords[1] + 4),
+        (body_coords[2] - 4, body_coords[1] + 2, body_coords[2] - 2, body_coords[1] + 4)
+    ]
+    if direction == "left":
+        exhaust_coords = [flip_coords(*coords) for coords in exhaust_coords]
+    shapes["exhaust"] += [("rectangle", coords) for coords in exhaust_coords]
+    return shapes
+
+# Masks are rasterized once per car type and direction, with the same
+# ImageDraw calls a sprite used to make, and reused for every sprite
+_PART_MASKS = {}
+_MASK_ARRAY = None
+_SPRITES = {}
+
+def part_masks(car_type, direction):
+    """{part: "L" mask image} for one car type and direction (cached)."""
+    key = (car_type, direction)
+    if key not in _PART_MASKS:
+        masks = {}
+        for part, shapes in car_part_shapes(car_type, direction).items():
+            mask = Image.new("L", (width, height), 0)
+            draw = ImageDraw.Draw(mask)
+            for shape, coords in shapes:
+                getattr(draw, shape)(coords, fill=255)
+            masks[part] = mask
+        _PART_MASKS[key] = masks
+    return _PART_MASKS[key]
+
+def random_car_spec(rng=random):
+    """Randomize car type and features."""
+    return {
+        "type": rng.choice(CAR_TYPES),
+        "color": rng.choice(CAR_COLORS),
+        "spoiler": rng.choice([True, False]),
+        "shaker": rng.choice([True, False]),
+        "exhaust": rng.choice([True, False]),
+        "paint": rng.choice(PAINT_STYLES),
+    }
+
+def car_layers(spec):
+    """(part, colour) pairs a spec draws, in drawing order."""
+    enabled = {
+        "stripe": spec["paint"] != "solid",
+        "stripe2": spec["paint"] == "double-striped",
+        "spoiler": spec["spoiler"],
+        "shaker": spec["shaker"],
+        "exhaust": spec["exhaust"],
+    }
+    return [(part, PART_COLORS[part] or spec["color"]) for part in PARTS if enabled.get(part, True)]
+
+def render_car(spec, direction):
+    # There are only a few hundred distinct sprites, so each is built once
+    key = (direction,) + tuple(spec[k] for k in ("type", "color", "spoiler", "shaker", "exhaust", "paint"))
+    if key not in _SPRITES:
+        image = Image.new("RGBA", (width, height), (0, 0, 0, 0))
+        masks = part_masks(spec["type"], direction)
+        for part, color in car_layers(spec):
+            image.paste(color, (0, 0), masks[part])
+        _SPRITES[key] = image
+    return _SPRITES[key].copy()
+
+def generate_car_image(direction, filename, atlas=None, rng=random):
+    """Save one random car (drawn from `rng`) to `filename`, or add it to
+    a SpriteAtlas (sprite_atlas.py) under that name."""
+    spec = random_car_spec(rng)
+    image = render_car(spec, direction)
+    if atlas is None:
+        image.save(filename)
+    else:
+        atlas.add(filename, image, direction=direction, frame=0, **spec)
+
+# ---------------------------
+# Batched assembly (numpy)
+# ---------------------------
+# A spec array has one row per sprite and one column per SPEC_FIELDS
+# entry, each an index into DIRECTIONS / CAR_TYPES / CAR_COLORS /
+# PAINT_STYLES or a 0/1 flag. assemble_cars() renders each distinct row
+# once by stacking part masks, then gathers the pixels for every row.
+
+def part_mask_array():
+    """(types, directions, parts, height, width) bool array of every mask."""
+    global _MASK_ARRAY
+    if _MASK_ARRAY is None:
+        _MASK_ARRAY = np.array([[[np.asarray(part_masks(t, d)[p]) > 0 for p in PARTS]
+                                 for d in DIRECTIONS] for t in CAR_TYPES])
+    return _MASK_ARRAY
+
+def random_car_specs(n, direction=None, rng=None):
+    """(n, len(SPEC_FIELDS)) spec array drawn uniformly; `direction`
+    fixes the direction column, otherwise it is random too."""
+    rng = rng or np.random.default_rng()
+    specs = np.stack([rng.integers(0, k, n) for k in SPEC_SIZES], axis=1)
+    if direction is not None:
+        specs[:, 1] = DIRECTIONS.index(direction)
+    return specs
+
+def _assemble_unique(specs):
+    n = len(specs)
+    masks = part_mask_array()[specs[:, 0], specs[:, 1]]  # (n, parts, h, w)
+    paint = specs[:, 6]
+    enabled = {
+        "stripe": paint >= 1,
+        "stripe2": paint == 2,
+        "spoiler": specs[:, 3] > 0,
+        "shaker": specs[:, 4] > 0,
+        "exhaust": specs[:, 5] > 0,
+    }
+    # Label each pixel with the last part that covers it (0 = none), then
+    # look the label up in a per-sprite colour table
+    label = np.zeros((n, height, width), np.uint8)
+    table = np.zeros((n, len(PARTS) + 1, 4), np.uint8)
+    body = np.array(CAR_COLORS, np.uint8)[specs[:, 2]]
+    for i, part in enumerate(PARTS):
+        on = masks[:, i]
+        if part in enabled:
+            on = on & enabled[part][:, None, None]
+        label[on] = i + 1
+        table[:, i + 1] = body if PART_COLORS[part] is None else PART_COLORS[part]
+    return table[np.arange(n)[:, None, None], label]
+
+def assemble_cars(specs):
+    """(n, height, width, 4) uint8 RGBA sprites for a spec array."""
+    specs = np.asarray(specs)
+    unique, inverse = np.unique(specs, axis=0, return_inverse=True)
+    return _assemble_unique(unique)[inverse.reshape(-1)]
+
+# ---------------------------
+# Mirrored variant sets
+# ---------------------------
+# A set only renders right-facing designs; each left-facing sprite is
+# its exact mirror image. (flip_coords is a pixel off and re-flips the
+# stripes, so a set's left cars are not pixel-equal to
+# generate_car_image("left").)
+
+def variant_specs():
+    """Spec array of every distinct right-facing design."""
+    sizes = SPEC_SIZES.copy()
+    sizes[1] = 1
+    grid = np.meshgrid(*[np.arange(k) for k in sizes], indexing="ij")
+    return np.stack(grid, axis=-1).reshape(-1, len(sizes))
+
+def sample_variants(n, rng=None):
+    """`n` distinct right-facing designs, drawn without replacement."""
+    specs = variant_specs()
+    if n > len(specs):
+        raise ValueError(f"only {len(specs)} distinct designs, asked for {n}")
+    rng = rng or np.random.default_rng()
+    return specs[rng.choice(len(specs), n, replace=False)]
+
+def mirrored_set(specs):
+    """(specs, right, left) for right-facing `specs`, dropping any sprite
+    whose pixels repeat an earlier one; left is right mirrored."""
+    right = assemble_cars(specs)
+    seen, keep = set(), []
+    for i, sprite in enumerate(right):
+        digest = hashlib.sha1(sprite.tobytes()).digest()
+        if digest not in seen:
+            seen.add(digest)
+            keep.append(i)
+    right = right[keep]
+    return np.asarray(specs)[keep], right, right[:, :, ::-1]
+
+def spec_traits(row):
+    """Spec array row -> the trait dict random_car_spec() would give."""
+    return {
+        "type": CAR_TYPES[row[0]],
+        "color": CAR_COLORS[row[2]],
+        "spoiler": bool(row[3]),
+        "shaker": bool(row[4]),
+        "exhaust": bool(row[5]),
+        "paint": PAINT_STYLES[row[6]],
+    }
+
+def write_car_set(specs, output_folder, atlas=None):
+    """Save car_right_i / car_left_i pairs for `specs`, or add them to a
+    SpriteAtlas; returns the number of pairs."""
+    specs, right, left = mirrored_set(specs)
+    if atlas is None:
+        os.makedirs(output_folder, exist_ok=True)
+    for i in range(len(specs)):
+        for direction, sprites in (("right", right), ("left", left)):
+            image = Image.fromarray(np.ascontiguousarray(sprites[i]), "RGBA")
+            name = f"car_{direction}_{i + 1}"
+            if atlas is None:
+                image.save(os.path.join(output_folder, name + ".png"))
+            else:
+                atlas.add(name, image, direction=direction, frame=0, **spec_traits(specs[i]))
+    return len(specs)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--unique", type=int, default=None,
+                        help="Write this many distinct designs, left cars mirrored from right")
+    parser.add_argument("--all", action="store_true", help="Write every distinct design, mirrored")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    parser.add_argument("--outdir", type=str, default="cars", help="Output folder")
+    parser.add_argument("--atlas", action="store_true", help="Pack into <outdir>/cars_N.png + cars.json")
+    args = parser.parse_args()
+
+    # Create a folder for the cars
+    output_folder = args.outdir
+    os.makedirs(output_folder, exist_ok=True)
+
+    atlas = None
+    if args.atlas:
+        from sprite_atlas import SpriteAtlas
+        atlas = SpriteAtlas()
+
+    if args.all or args.unique:
+        specs = variant_specs() if args.all else sample_variants(args.unique, np.random.default_rng(args.seed))
+        n = 2 * write_car_set(specs, output_folder, atlas)
+    else:
+        random.seed(args.seed)
+        # Generate 50 right-facing cars and 50 left-facing cars
+        for i in range(1, 51):
+            if atlas is None:
+                generate_car_image("right", os.path.join(output_folder, f"car_right_{i}.png"))
+                generate_car_image("left", os.path.join(output_folder, f"car_left_{i}.png"))
+            else:
+                generate_car_image("right", f"car_right_{i}", atlas)
+                generate_car_image("left", f"car_left_{i}", atlas)
+        n = 100
+
+    if atlas is None:
+        print(f"{n} car images saved to the '{output_folder}' folder.")
+    else:
+        print(f"{n} cars packed into {atlas.save(os.path.join(output_folder, 'cars'))}")
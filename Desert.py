@@ -1,47 +1,136 @@
 from PIL import Image, ImageDraw
+import argparse
 import random
 
-def generate_desert_ground(filename="desert_ground.png"):
-    width, height = 100, 100
+from terrain_common import draw_features, feature_count, sampled_count, save_texture
 
-    # Create a new image with RGB mode
-    img = Image.new("RGB", (width, height), "#F4A460")
-    draw = ImageDraw.Draw(img)
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+BASE_COLOR = "#F4A460"
+LAYERS = ["pebbles", "rocks", "waves"]
+# Features per 100x100 px, as generate_desert_ground draws them
+PER_PATCH = {"pebbles": 300, "rocks": 20, "waves": 10}
+# How far a feature drawn at a density reaches past its anchor (waves), px
+REACH = 100
+
+def desert_features(rng, width=100, height=100, density=None):
+    """{layer: [(shape, coords, options), ...]} for one width x height
+    patch, drawn with `rng` (the random module or a random.Random).
+    Counts are those of the 100x100 texture; with `density` they scale
+    with area instead (density times PER_PATCH per 100x100 px) and waves
+    start anywhere and keep their 100px-patch spread, as in
+    desert_ground_array."""
+    counts = PER_PATCH
+    if density is not None:
+        counts = {layer: sampled_count(n, (width, height), density, rng) for layer, n in PER_PATCH.items()}
+    features = {layer: [] for layer in LAYERS}
 
     # Generate random pebbles and details
-    for _ in range(300):
-        x, y = random.randint(0, width - 1), random.randint(0, height - 1)
-        size = random.randint(1, 3)  # Size of pebbles
-        color_variation = random.randint(-20, 20)
+    for _ in range(counts["pebbles"]):
+        x, y = rng.randint(0, width - 1), rng.randint(0, height - 1)
+        size = rng.randint(1, 3)  # Size of pebbles
+        color_variation = rng.randint(-20, 20)
         color = (
             max(0, min(255, 244 + color_variation)),  # R
             max(0, min(255, 164 + color_variation)),  # G
             max(0, min(255, 96 + color_variation))   # B
         )
-        draw.ellipse([x, y, x + size, y + size], fill=color)
+        features["pebbles"].append(("ellipse", [x, y, x + size, y + size], {"fill": color}))
 
     # Add larger rocks
-    for _ in range(20):
-        x, y = random.randint(0, width - 1), random.randint(0, height - 1)
-        size = random.randint(5, 10)  # Size of rocks
-        color_variation = random.randint(-40, 40)
+    for _ in range(counts["rocks"]):
+        x, y = rng.randint(0, width - 1), rng.randint(0, height - 1)
+        size = rng.randint(5, 10)  # Size of rocks
+        color_variation = rng.randint(-40, 40)
         color = (
             max(0, min(255, 160 + color_variation)),  # R
             max(0, min(255, 82 + color_variation)),   # G
             max(0, min(255, 45 + color_variation))    # B
         )
-        draw.ellipse([x, y, x + size, y + size], fill=color)
+        features["rocks"].append(("ellipse", [x, y, x + size, y + size], {"fill": color}))
 
     # Add wavy patterns for texture
-    for _ in range(10):
-        start_x = random.randint(0, width // 2)
-        end_x = random.randint(width // 2, width)
-        start_y = random.randint(0, height - 10)
-        end_y = start_y + random.randint(-3, 3)
-        draw.line([(start_x, start_y), (end_x, end_y)], fill="#E9967A", width=1)
-
-    img.save(filename)
+    for _ in range(counts["waves"]):
+        if density is None:
+            start_x = rng.randint(0, width // 2)
+            end_x = rng.randint(width // 2, width)
+            start_y = rng.randint(0, height - 10)
+        else:
+            start_x = rng.randint(0, width - 1)
+            end_x = start_x + rng.randint(50, 100) - rng.randint(0, 50)
+            start_y = rng.randint(0, height - 1)
+        end_y = start_y + rng.randint(-3, 3)
+        features["waves"].append(("line", [start_x, start_y, end_x, end_y], {"fill": "#E9967A", "width": 1}))
+    return features
+
+def desert_ground_image(rng=random, wrap=False):
+    """One 100x100 desert ground image drawn with `rng`."""
+    width, height = 100, 100
+
+    # Create a new image with RGB mode
+    img = Image.new("RGB", (width, height), BASE_COLOR)
+    draw = ImageDraw.Draw(img)
+    features = desert_features(rng, width, height)
+    for layer in LAYERS:
+        draw_features(draw, features[layer], wrap=(width, height) if wrap else None)
+    return img
+
+def generate_desert_ground(filename="desert_ground.png", wrap=False, mipmaps=None, rng=random):
+    img = desert_ground_image(rng, wrap)
+    save_texture(img, filename, wrap, mipmaps)
     print(f"Generated desert ground image saved as {filename}")
 
+def desert_ground_array(size=(100, 100), density=1.0, rng=None, wrap=False):
+    """Desert ground of any size as an (h, w, 3) uint8 array.
+
+    Same features as generate_desert_ground, sampled as arrays and
+    splatted in bulk; counts scale with area (`density` times PER_PATCH
+    per 100x100 px) and wave lengths keep their 100px-patch spread.
+    With wrap=True the texture tiles seamlessly.
+    """
+    from terrain_raster import splat_ellipses, splat_lines
+    rng = rng or np.random.default_rng()
+    width, height = size
+    buf = np.empty((height, width, 3), np.uint8)
+    buf[:] = (244, 164, 96)
+
+    # Pebbles, then larger rocks
+    for layer, sizes, base, spread in (("pebbles", (1, 3), (244, 164, 96), 20),
+                                       ("rocks", (5, 10), (160, 82, 45), 40)):
+        n = feature_count(PER_PATCH[layer], size, density)
+        x, y = rng.integers(0, width, n), rng.integers(0, height, n)
+        s = rng.integers(sizes[0], sizes[1] + 1, n)
+        variation = rng.integers(-spread, spread + 1, n)
+        colors = np.clip(np.array(base) + variation[:, None], 0, 255).astype(np.uint8)
+        splat_ellipses(buf, x, y, s, colors, wrap)
+
+    # Wavy patterns for texture
+    n = feature_count(PER_PATCH["waves"], size, density)
+    x0, y0 = rng.integers(0, width, n), rng.integers(0, height, n)
+    x1 = x0 + rng.integers(50, 101, n) - rng.integers(0, 51, n)
+    y1 = y0 + rng.integers(-3, 4, n)
+    splat_lines(buf, x0, y0, x1, y1, np.tile(np.array([233, 150, 122], np.uint8), (n, 1)), wrap)
+    return buf
+
 # Generate the image
-generate_desert_ground()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=None, help="Side of a large vectorized texture")
+    parser.add_argument("--density", type=float, default=1.0, help="Feature density (1 = the 100x100 look)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    parser.add_argument("--out", type=str, default="desert_ground.png", help="Output file")
+    parser.add_argument("--wrap", action="store_true", help="Seamless: features crossing an edge wrap around")
+    parser.add_argument("--mipmaps", choices=["box", "lanczos"], default=None,
+                        help="Save the texture with its mipmap chain in one file (plus a .json of level rects)")
+    args = parser.parse_args()
+
+    if args.size:
+        buf = desert_ground_array((args.size, args.size), args.density, np.random.default_rng(args.seed), args.wrap)
+        save_texture(Image.fromarray(buf, "RGB"), args.out, args.wrap, args.mipmaps)
+        print(f"Generated desert ground image saved as {args.out}")
+    else:
+        random.seed(args.seed)
+        generate_desert_ground(args.out, args.wrap, args.mipmaps)
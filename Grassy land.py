@@ -1,24 +1,89 @@
 from PIL import Image, ImageDraw
+import argparse
 import random
 
-def generate_grass_texture(filename="grass_texture2.png", size=(100, 100)):
-    """Generate a seamless grass texture."""
+from terrain_common import draw_features, feature_count, sampled_count, save_texture
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+BASE_COLOR = "green"  # Base color for grass
+LAYERS = ["blades"]
+# Blades per 100x100 px, as generate_grass_texture draws them
+PER_PATCH = 200
+# How far past its anchor a blade can reach, px
+REACH = 20
+BLADE_COLORS = [(34, 139, 34), (50, 205, 50), (0, 128, 0)]  # Variations of green
+
+def grass_features(rng, width=100, height=100, density=None):
+    """{layer: [(shape, coords, options), ...]} for one width x height
+    patch, drawn with `rng` (the random module or a random.Random).
+    PER_PATCH blades, as in the 100x100 texture; with `density` the
+    count scales with area instead (density times PER_PATCH per 100x100 px)."""
+    n = PER_PATCH if density is None else sampled_count(PER_PATCH, (width, height), density, rng)
+    blades = []
+    # Add random grass-like strokes
+    for _ in range(n):  # Number of grass blades
+        x1 = rng.randint(0, width)
+        y1 = rng.randint(0, height)
+        x2 = x1 + rng.randint(-10, 10)  # Slightly angled
+        y2 = y1 - rng.randint(10, 20)  # Taller strokes
+        color = rng.choice(BLADE_COLORS)
+        blades.append(("line", [x1, y1, x2, y2], {"fill": color, "width": 1}))
+    return {"blades": blades}
+
+def grass_texture_image(rng=random, size=(100, 100), wrap=False):
+    """A grass texture drawn with `rng`; with wrap=True it is seamless."""
     width, height = size
-    img = Image.new("RGB", size, "green")  # Base color for grass
+    img = Image.new("RGB", size, BASE_COLOR)
     draw = ImageDraw.Draw(img)
+    draw_features(draw, grass_features(rng, width, height)["blades"], wrap=size if wrap else None)
+    return img
 
-    # Add random grass-like strokes
-    for _ in range(200):  # Number of grass blades
-        x1 = random.randint(0, width)
-        y1 = random.randint(0, height)
-        x2 = x1 + random.randint(-10, 10)  # Slightly angled
-        y2 = y1 - random.randint(10, 20)  # Taller strokes
-        color = random.choice([(34, 139, 34), (50, 205, 50), (0, 128, 0)])  # Variations of green
-        draw.line((x1, y1, x2, y2), fill=color, width=1)
+def generate_grass_texture(filename="grass_texture2.png", size=(100, 100), wrap=False, mipmaps=None, rng=random):
+    """Generate a grass texture; with wrap=True it is seamless."""
+    img = grass_texture_image(rng, size, wrap)
 
     # Save the texture
-    img.save(filename)
+    save_texture(img, filename, wrap, mipmaps)
     print(f"Grass texture saved as {filename}")
 
+def grass_texture_array(size=(100, 100), density=1.0, rng=None, wrap=False):
+    """Grass of any size as an (h, w, 3) uint8 array, with the blades of
+    generate_grass_texture sampled as arrays and splatted in bulk;
+    `density` times PER_PATCH blades per 100x100 px. With wrap=True the
+    texture tiles seamlessly."""
+    from terrain_raster import splat_lines
+    rng = rng or np.random.default_rng()
+    width, height = size
+    buf = np.empty((height, width, 3), np.uint8)
+    buf[:] = (0, 128, 0)
+    n = feature_count(PER_PATCH, size, density)
+    x1, y1 = rng.integers(0, width + 1, n), rng.integers(0, height + 1, n)
+    x2 = x1 + rng.integers(-10, 11, n)  # Slightly angled
+    y2 = y1 - rng.integers(10, 21, n)  # Taller strokes
+    colors = np.array(BLADE_COLORS, np.uint8)[rng.integers(0, len(BLADE_COLORS), n)]
+    splat_lines(buf, x1, y1, x2, y2, colors, wrap)
+    return buf
+
 # Generate and save the grass texture
-generate_grass_texture()
\ No newline at end of file
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=None, help="Side of a large vectorized texture")
+    parser.add_argument("--density", type=float, default=1.0, help="Blade density (1 = the 100x100 look)")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    parser.add_argument("--out", type=str, default="grass_texture2.png", help="Output file")
+    parser.add_argument("--wrap", action="store_true", help="Seamless: features crossing an edge wrap around")
+    parser.add_argument("--mipmaps", choices=["box", "lanczos"], default=None,
+                        help="Save the texture with its mipmap chain in one file (plus a .json of level rects)")
+    args = parser.parse_args()
+
+    if args.size:
+        buf = grass_texture_array((args.size, args.size), args.density, np.random.default_rng(args.seed), args.wrap)
+        save_texture(Image.fromarray(buf, "RGB"), args.out, args.wrap, args.mipmaps)
+        print(f"Grass texture saved as {args.out}")
+    else:
+        random.seed(args.seed)
+        generate_grass_texture(args.out, wrap=args.wrap, mipmaps=args.mipmaps)
\ No newline at end of file
@@ -4,13 +4,33 @@ Wallpaper Generator — Phone-Ready, High Variation Each Run
 
 Usage:
   python wallpaper_generator.py [--w 1170] [--h 2532] [--seed 123] [--outdir output]
+  python wallpaper_generator.py --count 500 --workers 8 [--seed 123] [--threads]
+  python wallpaper_generator.py --engine numpy   # float32 compositing backend
+  python wallpaper_generator.py --format webp    # png-fast, png-small, webp-lossless, webp, jpeg
+  python wallpaper_generator.py --export-set [--sizes 1170x2532,1440x3200]
+  python wallpaper_generator.py --tiled --w 7680 --h 16000 [--strip 512]
+  python wallpaper_generator.py --seed 7 --trace trace.json [--trace-format chrome]
+  python wallpaper_generator.py --seed 7 --animate 90 [--fps 30] [--anim-format apng|frames|raw]
+  python wallpaper_generator.py --preview --count 100 [--preview-size 256]   # thumbnails + scene JSON
+  python wallpaper_generator.py --scene output/wallpaper_123.json [--w 1440 --h 3200]
 
 Requires: Pillow (PIL), numpy (optional but recommended)
 """
 import math
 import os
+import queue
 import random
 import argparse
+import json
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 
 try:
@@ -36,7 +56,67 @@ def hex_to_rgb(h):
         h = ''.join([c*2 for c in h])
     return tuple(int(h[i:i+2], 16) for i in (0, 2, 4))
 
-def choose_palette():
+# ---------------------------
+# Random streams
+# ---------------------------
+# Every stage draws from an explicit rng instead of the global random and
+# np.random, so renders can run on threads, in any order, with the same
+# output. Stages called without one fall back to the global modules.
+
+class RenderRng(random.Random):
+    """The random streams of one render: the random.Random methods for
+    scalar draws and `.np`, a numpy RandomState, for array draws.
+
+    RenderRng(seed) draws exactly what random.seed(seed) and
+    np.random.seed(seed) used to give globally, so seeds keep their
+    designs. spawn(n) derives n independent child streams through a numpy
+    SeedSequence, for fanning many renders out of one root without
+    picking seeds: RenderRng(7).spawn(100) gives the same hundred
+    streams every time, each usable as compose_wallpaper(rng=...) or, as
+    a random.Random, by the car, character and terrain generators.
+    """
+    def __init__(self, seed=None, sequence=None):
+        self.seed_value, self.sequence = seed, sequence
+        if sequence is not None:
+            words = sequence.generate_state(4)
+            super().__init__(int.from_bytes(words.tobytes(), "little"))
+            self.np = np.random.RandomState(words)
+        else:
+            super().__init__(seed)
+            self.np = np.random.RandomState(seed) if np is not None else None
+
+    def spawn(self, n):
+        """n new child streams, independent of this one and of each other.
+        Further calls continue the sequence with fresh children."""
+        if np is None:
+            raise RuntimeError("RenderRng.spawn requires numpy")
+        if self.sequence is None:
+            # Built on first use, so plain RenderRng(seed) renders skip it
+            self.sequence = np.random.SeedSequence(self.seed_value)
+        return [RenderRng(sequence=child) for child in self.sequence.spawn(n)]
+
+    def fork(self):
+        """A copy of this stream (not an independent one): it draws what
+        this stream would draw next, without advancing it."""
+        twin = RenderRng(0)
+        twin.setstate(self.getstate())
+        if self.np is not None:
+            twin.np.set_state(self.np.get_state())
+        twin.seed_value, twin.sequence = self.seed_value, self.sequence
+        return twin
+
+class _GlobalRng:
+    """The global random / np.random pair behind one rng-like object."""
+    def __getattr__(self, name):
+        return getattr(random, name)
+
+    @property
+    def np(self):
+        return np.random
+
+GLOBAL_RNG = _GlobalRng()
+
+def choose_palette(rng=GLOBAL_RNG):
     # Hand-picked palettes with contrast + harmony
     palettes = [
         ["#0f0f1a","#1b1f3b","#533a71","#a88fac","#ffd6e0"],
@@ -52,42 +132,385 @@ def choose_palette():
         ["#1b262c","#0f4c75","#3282b8","#bbe1fa","#f7f7ff"],
         ["#1d1e22","#2c2e33","#3f4147","#ffd166","#ef476f"],
     ]
-    p = random.choice(palettes)
-    random.shuffle(p)
+    p = rng.choice(palettes)
+    rng.shuffle(p)
     return list(map(hex_to_rgb, p))
 
-def random_phone_size():
-    common = [(1170,2532),(1242,2688),(1440,3200),(1080,2400),(1290,2796),(1440,2560)]
-    return random.choice(common)
+PHONE_SIZES = [(1170,2532),(1242,2688),(1440,3200),(1080,2400),(1290,2796),(1440,2560)]
+
+def random_phone_size(rng=GLOBAL_RNG):
+    return rng.choice(PHONE_SIZES)
+
+def band_rows(size, band=None):
+    """(y0, y1) of a horizontal band of the frame; the whole frame if None.
+
+    Stages that take `band` render only those rows of the full-size
+    design, into an image (w, y1 - y0) tall, so the tiled renderer can
+    build a frame strip by strip.
+    """
+    return (0, size[1]) if band is None else band
+
+def px(v):
+    """Snap a frame coordinate to whole pixels before drawing.
+
+    ImageDraw rounds float coordinates in ways that are not invariant
+    under shifting the image (ellipses truncate towards zero), so a band
+    drawn with `y - top` could differ from the same rows of the full
+    frame. Whole-pixel input makes band and frame agree exactly.
+    """
+    return math.floor(v + 0.5)
 
-def save_image(img, outdir):
+def new_layer(size, band=None):
+    y0, y1 = band_rows(size, band)
+    return Image.new("RGBA", (size[0], y1 - y0), (0,0,0,0))
+
+# (format, extension, save options). optimize=True searches every zlib
+# strategy and costs as much as a render on grainy frames for ~4% less
+# than compress_level=1, so it is opt-in.
+ENCODE_PROFILES = {
+    "png-fast": ("PNG", "png", {"compress_level": 1}),
+    "png-small": ("PNG", "png", {"optimize": True}),
+    "webp-lossless": ("WEBP", "webp", {"lossless": True, "quality": 0, "method": 0}),
+    "webp": ("WEBP", "webp", {"quality": 92, "method": 4}),
+    "jpeg": ("JPEG", "jpg", {"quality": 95, "subsampling": 0}),
+}
+
+def save_image(img, outdir, name=None, profile="png-fast"):
+    fmt, ext, options = ENCODE_PROFILES[profile]
     os.makedirs(outdir, exist_ok=True)
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    path = os.path.join(outdir, f"wallpaper_{ts}.png")
-    img.save(path, "PNG", optimize=True)
+    if name is None:
+        name = "wallpaper_" + datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+    path = os.path.join(outdir, f"{name}.{ext}")
+    with stage("encode", profile=profile) as info:
+        img.save(path, fmt, **options)
+        info["bytes"] = os.path.getsize(path)
     print(f"Saved: {path}")
+    return path
+
+# ---------------------------
+# Render trace
+# ---------------------------
+# Stages report through stage()/traced(). Outside render_trace() they
+# cost one global lookup; inside, each records its wall time and the
+# size of what it produced.
+
+_TRACE = None
+
+class RenderTrace:
+    """Per-stage timings of everything rendered while it is active.
+
+    `hook`, if given, is called with each event dict as it is recorded.
+    """
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.events = []
+        self.t0 = time.perf_counter()
+
+    def record(self, name, start, end, info):
+        event = {"name": name, "start_ms": (start - self.t0) * 1e3,
+                 "ms": (end - start) * 1e3, "tid": threading.get_ident(), **info}
+        self.events.append(event)
+        if self.hook is not None:
+            self.hook(event)
+
+    def totals(self):
+        """{name: [calls, total ms]}, slowest first."""
+        out = {}
+        for e in self.events:
+            calls, ms = out.get(e["name"], (0, 0.0))
+            out[e["name"]] = [calls + 1, ms + e["ms"]]
+        return dict(sorted(out.items(), key=lambda kv: -kv[1][1]))
+
+    def chrome_events(self):
+        pid = os.getpid()
+        return [{"name": e["name"], "cat": e["name"].split("/")[0], "ph": "X",
+                 "ts": e["start_ms"] * 1e3, "dur": e["ms"] * 1e3, "pid": pid, "tid": e["tid"],
+                 "args": {k: v for k, v in e.items() if k not in ("name", "start_ms", "ms", "tid")}}
+                for e in self.events]
+
+    def dump(self, path, fmt="json"):
+        """Write the events as plain JSON or as a Chrome trace
+        (chrome://tracing, Perfetto)."""
+        if fmt == "chrome":
+            data = {"traceEvents": self.chrome_events(), "displayTimeUnit": "ms"}
+        else:
+            data = {"stages": self.events, "totals": self.totals()}
+        with open(path, "w") as f:
+            json.dump(data, f, indent=1)
+        print(f"Trace: {path}")
+
+@contextmanager
+def render_trace(trace=None):
+    """Collect stage timings into `trace` (a new RenderTrace if None)."""
+    global _TRACE
+    prev, _TRACE = _TRACE, trace or RenderTrace()
+    try:
+        yield _TRACE
+    finally:
+        _TRACE = prev
+
+@contextmanager
+def stage(name, **info):
+    """Time the enclosed block as `name`; fields added to the yielded
+    dict are stored with the event."""
+    trace = _TRACE
+    if trace is None:
+        yield info
+        return
+    start = time.perf_counter()
+    try:
+        yield info
+    finally:
+        trace.record(name, start, time.perf_counter(), info)
+
+def output_bytes(out):
+    if isinstance(out, Image.Image):
+        return out.width * out.height * len(out.getbands())
+    return _nbytes(out)
+
+def traced(name, fn, *args, info=None, **kwargs):
+    """fn(*args, **kwargs), recorded as stage `name` with its output size."""
+    if _TRACE is None:
+        return fn(*args, **kwargs)
+    with stage(name, **(info or {})) as fields:
+        out = fn(*args, **kwargs)
+        fields["bytes"] = output_bytes(out)
+    return out
+
+# ---------------------------
+# Blur
+# ---------------------------
+# A Gaussian of large radius carries no detail finer than a fraction of
+# that radius, so it can run on a copy reduced by an integer factor f and
+# be scaled back up. The box reduce and the bilinear upsample blur too
+# (variances (f^2 - 1)/12 and f^2/6 in full-size pixels); the reduced
+# blur takes only the rest, so the total matches sigma = radius.
+# The reduction grid is anchored at the image corner: pyramid blurs are
+# not shift-invariant, so banded renders only use them on whole objects.
+
+# The smallest sigma, in reduced pixels, a pyramid blur keeps. Radii up to
+# twice this run exact; raise it for accuracy, math.inf turns pyramids off.
+BLUR_QUALITY = 4.0
+
+def blur_factor(radius, quality=None):
+    """The reduction factor for a blur of `radius` (1 = exact)."""
+    quality = BLUR_QUALITY if quality is None else quality
+    if not quality > 0:
+        raise ValueError(f"blur quality must be positive, got {quality}")
+    if not radius > 2 * quality:
+        return 1
+    return int(radius // quality)
+
+def _reduced_sigma(radius, f):
+    return math.sqrt(max(radius * radius - (f * f - 1) / 12 - f * f / 6, 0.0)) / f
+
+def _pil_edge_pad(img, f):
+    # Replicate edges out by f on every side, plus up to a multiple of f
+    w, h = img.size
+    right, bottom = f - w % f if w % f else 0, f - h % f if h % f else 0
+    out = Image.new(img.mode, (w + 2 * f + right, h + 2 * f + bottom))
+    out.paste(img, (f, f))
+    out.paste(img.crop((0, 0, 1, h)).resize((f, h)), (0, f))
+    out.paste(img.crop((w - 1, 0, w, h)).resize((f + right, h)), (f + w, f))
+    out.paste(out.crop((0, f, out.width, f + 1)).resize((out.width, f)), (0, 0))
+    out.paste(out.crop((0, f + h - 1, out.width, f + h)).resize((out.width, f + bottom)), (0, f + h))
+    return out
+
+def _pil_pyramid_blur(img, radius, f):
+    if img.mode in ("RGBA", "LA"):
+        # reduce() and resize() premultiply alpha where GaussianBlur does
+        # not; blur the bands apart so both paths darken edges alike
+        return Image.merge(img.mode, [_pil_pyramid_blur(band, radius, f) for band in img.split()])
+    w, h = img.size
+    small = _pil_edge_pad(img, f).reduce(f).filter(ImageFilter.GaussianBlur(_reduced_sigma(radius, f)))
+    return small.resize((w, h), Image.BILINEAR, box=(1, 1, 1 + w / f, 1 + h / f))
+
+def _upsample_axis(a, f, n, axis):
+    # Bilinear; reduced pixel i + 1 (after the border) is centred on
+    # full-size pixel (i + 0.5) f
+    pos = (np.arange(n) + 0.5) / f + 0.5
+    i0 = np.minimum(np.floor(pos).astype(np.intp), a.shape[axis] - 1)
+    i1 = np.minimum(i0 + 1, a.shape[axis] - 1)
+    shape = [1] * a.ndim
+    shape[axis] = n
+    t = (pos - np.floor(pos)).astype(np.float32).reshape(shape)
+    lo, hi = np.take(a, i0, axis), np.take(a, i1, axis)
+    hi -= lo
+    hi *= t
+    lo += hi
+    return lo
+
+def _np_pyramid_blur(canvas, radius, f):
+    h, w = canvas.shape[:2]
+    pad = [(f, f + -h % f), (f, f + -w % f)] + [(0, 0)] * (canvas.ndim - 2)
+    src = np.pad(canvas, pad, mode="edge")
+    sh, sw = src.shape[0] // f, src.shape[1] // f
+    small = src.reshape(sh, f, sw, f, *canvas.shape[2:]).mean(axis=(1, 3), dtype=np.float32)
+    small = np_gaussian_blur(small, _reduced_sigma(radius, f))
+    return _upsample_axis(_upsample_axis(small, f, h, 0), f, w, 1)
+
+def gaussian_blur(img, radius, quality=None):
+    """Gaussian blur (sigma = radius) of a PIL image or a float32 canvas.
+
+    Every blur in the generator goes through here. Radii above twice
+    `quality` (default BLUR_QUALITY) are blurred at 1/blur_factor() size
+    and scaled back up; smaller ones are exact.
+    """
+    f = blur_factor(radius, quality)
+    info = {"radius": radius, "factor": f}
+    if isinstance(img, Image.Image):
+        if f == 1:
+            return traced("blur", img.filter, ImageFilter.GaussianBlur(radius=radius), info=info)
+        return traced("blur", _pil_pyramid_blur, img, radius, f, info=info)
+    if f == 1:
+        return traced("blur", np_gaussian_blur, img, radius, info=info)
+    return traced("blur", _np_pyramid_blur, img, radius, f, info=info)
+
+# ---------------------------
+# Field cache
+# ---------------------------
+# Batch runs reuse a handful of phone sizes, so size-dependent fields
+# (coordinate grids, the radial distance map, the vignette mask) and the
+# noise tile are built once and kept in a byte-bounded LRU.
+
+NOISE_TILE = 1024
+
+class FieldCache:
+    """LRU of arrays/images keyed by (kind, size, ...), bounded in bytes."""
+
+    def __init__(self, max_bytes=256 * 2**20):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._items = OrderedDict()
+        # Renders on several threads share the cache; build() runs
+        # unlocked, so two threads may build the same entry once each
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the cached value for `key`, calling build() on a miss."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return item[0]
+            self.misses += 1
+        value = build()
+        size = _nbytes(value)
+        if size <= self.max_bytes:
+            with self._lock:
+                if key not in self._items:
+                    self._items[key] = (value, size)
+                    self.nbytes += size
+                while self.nbytes > self.max_bytes:
+                    _, (_, old) = self._items.popitem(last=False)
+                    self.nbytes -= old
+                    self.evictions += 1
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.nbytes = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "entries": len(self._items),
+                "nbytes": self.nbytes, "max_bytes": self.max_bytes}
+
+def _nbytes(value):
+    if isinstance(value, tuple):
+        return sum(_nbytes(v) for v in value)
+    if isinstance(value, Image.Image):
+        return value.width * value.height * len(value.getbands())
+    return value.nbytes
+
+def _frozen(*arrays):
+    # Cached arrays are shared between callers; make accidental writes fail
+    for a in arrays:
+        a.flags.writeable = False
+    return arrays[0] if len(arrays) == 1 else arrays
+
+FIELD_CACHE = FieldCache()
+
+def unit_grid(size):
+    """Open grids x (1, w) and y (h, 1) spanning -0.5..0.5."""
+    w, h = size
+    return FIELD_CACHE.get(("grid", size), lambda: _frozen(
+        np.linspace(-0.5, 0.5, w, dtype=np.float32)[None, :],
+        np.linspace(-0.5, 0.5, h, dtype=np.float32)[:, None]))
+
+def radial_distance(size, band=None):
+    """Distance from the centre over the half-diagonal, clipped to 0..1.
+
+    Full frames are cached; bands (tiled rendering) are computed directly
+    so nothing frame-sized is kept.
+    """
+    def build():
+        w, h = size
+        y0, y1 = band_rows(size, band)
+        y, x = np.ogrid[y0:y1, :w]
+        dist = np.hypot(x - w/2, y - h/2).astype(np.float32)
+        dist *= 2 / math.hypot(w, h)
+        return _frozen(dist.clip(0, 1, out=dist))
+    if band is not None:
+        return build()
+    return FIELD_CACHE.get(("radial", size), build)
+
+def noise_tile():
+    """A fixed NOISE_TILE^2 field of standard-normal samples."""
+    return FIELD_CACHE.get(("noise", NOISE_TILE), lambda: _frozen(
+        np.random.default_rng(0).standard_normal((NOISE_TILE, NOISE_TILE), dtype=np.float32)))
+
+def noise_image(size, sigma, y0=0, rng=GLOBAL_RNG):
+    """Gaussian noise around mid-grey, like Image.effect_noise but seeded.
+
+    Image.effect_noise draws from C rand(), which ignores our seed, so the
+    same seed gave different grain in every process. Here the cached noise
+    tile is rolled by a per-seed offset and tiled over the frame. `y0`
+    is the first frame row when rendering a band.
+    """
+    if np is None:
+        return Image.effect_noise(size, sigma)
+    w, h = size
+    ox, oy = rng.np.randint(0, NOISE_TILE, 2)
+    tile = np.roll(noise_tile(), (-((oy + y0) % NOISE_TILE), -ox), axis=(0, 1))
+    reps = (-(-h // NOISE_TILE), -(-w // NOISE_TILE))
+    noise = np.tile(tile, reps)[:h, :w] * np.float32(sigma)
+    noise += 128
+    return Image.fromarray(noise.clip(0, 255, out=noise).astype(np.uint8), "L")
 
 # ---------------------------
 # Backgrounds
 # ---------------------------
 
-def bg_linear_gradient(size, c1, c2, angle_deg=None):
+def _gradient_image(t, c1, c2):
+    # Per-pixel lerp from c1 (t=0) to c2 (t=1)
+    c1 = np.asarray(c1, dtype=np.float32)
+    arr = t[..., None] * (np.asarray(c2, dtype=np.float32) - c1)
+    arr += c1
+    return Image.fromarray(arr.astype(np.uint8), "RGB")
+
+def bg_linear_gradient(size, c1, c2, angle_deg=None, band=None, rng=GLOBAL_RNG):
     w, h = size
     if angle_deg is None:
-        angle_deg = random.uniform(0, 360)
+        angle_deg = rng.uniform(0, 360)
     angle = math.radians(angle_deg)
     # Create coordinates grid with numpy if available (faster & smoother)
     if np is not None:
-        x = np.linspace(-0.5, 0.5, w)
-        y = np.linspace(-0.5, 0.5, h)
-        X, Y = np.meshgrid(x, y)
-        t = (np.cos(angle) * X + np.sin(angle) * Y)
-        t = (t - t.min()) / (t.max() - t.min() + 1e-8)
-        r = (1 - t) * c1[0] + t * c2[0]
-        g = (1 - t) * c1[1] + t * c2[1]
-        b = (1 - t) * c1[2] + t * c2[2]
-        arr = np.dstack([r, g, b]).astype(np.uint8)
-        return Image.fromarray(arr, mode="RGB")
+        X, Y = unit_grid(size)
+        y0, y1 = band_rows(size, band)
+        Y = Y[y0:y1]
+        ca, sa = math.cos(angle), math.sin(angle)
+        t = ca * X + sa * Y
+        # t is linear, so its range is set by the corners of the grid
+        t_max = 0.5 * (abs(ca) + abs(sa))
+        t += t_max
+        t *= 1 / (2 * t_max + 1e-8)
+        return _gradient_image(t, c1, c2)
     else:
         # Fallback: draw lines
         img = Image.new("RGB", size, c1)
@@ -103,21 +526,16 @@ def bg_linear_gradient(size, c1, c2, angle_deg=None):
                 draw.line([(0,i),(w,i)], fill=col)
         if angle_deg not in (0, 90, 180, 270):
             img = img.rotate(angle_deg, resample=Image.BICUBIC, expand=False)
+        if band is not None:
+            img = img.crop((0, band[0], w, band[1]))
         return img
 
-def bg_radial_gradient(size, inner, outer):
+def bg_radial_gradient(size, inner, outer, band=None):
     w, h = size
     cx, cy = w/2, h/2
     max_r = math.hypot(w, h)/2
     if np is not None:
-        y, x = np.ogrid[:h, :w]
-        dist = np.sqrt((x - cx)**2 + (y - cy)**2)
-        t = (dist / max_r).clip(0, 1)
-        r = (1 - t) * inner[0] + t * outer[0]
-        g = (1 - t) * inner[1] + t * outer[1]
-        b = (1 - t) * inner[2] + t * outer[2]
-        arr = np.dstack([r, g, b]).astype(np.uint8)
-        return Image.fromarray(arr, "RGB")
+        return _gradient_image(radial_distance(size, band), inner, outer)
     else:
         img = Image.new("RGB", size, outer)
         mask = Image.new("L", size, 0)
@@ -127,12 +545,15 @@ def bg_radial_gradient(size, inner, outer):
             alpha = int(255 * (1 - i / 512))
             mdraw.ellipse([cx - r, cy - r, cx + r, cy + r], fill=alpha)
         fg = Image.new("RGB", size, inner)
-        return Image.composite(fg, img, mask)
+        img = Image.composite(fg, img, mask)
+        if band is not None:
+            img = img.crop((0, band[0], w, band[1]))
+        return img
 
-def add_paper_texture(img, strength=0.08):
+def add_paper_texture(img, strength=0.08, y0=0, rng=GLOBAL_RNG, sigma=100):
     w, h = img.size
-    noise = Image.effect_noise((w, h), 100)
-    noise = noise.filter(ImageFilter.GaussianBlur(radius=1.2))
+    noise = noise_image((w, h), sigma, y0, rng)
+    noise = gaussian_blur(noise, 1.2)
     # Normalize and blend
     if strength > 0:
         noise = ImageEnhance.Contrast(noise).enhance(1.2)
@@ -141,79 +562,269 @@ def add_paper_texture(img, strength=0.08):
         img = ImageChops.blend(img, noise_rgb, strength)
     return img
 
+# ---------------------------
+# Stamp rasterizer
+# ---------------------------
+# pattern_dots draws the same disc thousands of times. It is rasterized
+# once per radius bucket (anti-aliased, which ImageDraw.ellipse is not)
+# and reused as a stamp.
+
+def _radius_bucket(r):
+    # 1/4 px steps for small discs, whole pixels (<3% off) above 16 px
+    return round(r * 4) / 4 if r < 16 else float(round(r))
+
+def disc_stamp(radius, supersample=4):
+    """Anti-aliased disc coverage (uint8, 0..255) centred on the middle pixel.
+
+    The array is (2k+1) square with k = ceil(radius). Stamps are cached
+    per radius bucket in FIELD_CACHE.
+    """
+    radius = _radius_bucket(radius)
+    def build():
+        k = int(math.ceil(radius))
+        n = 2 * k + 1
+        o = (np.arange(n * supersample) + 0.5) / supersample - (k + 0.5)
+        inside = (o[None, :] ** 2 + o[:, None] ** 2) <= radius * radius
+        cover = inside.reshape(n, supersample, n, supersample).mean(axis=(1, 3))
+        return _frozen((cover * 255 + 0.5).astype(np.uint8))
+    return FIELD_CACHE.get(("disc", radius, supersample), build)
+
+# ---------------------------
+# Distance-field layers
+# ---------------------------
+# Stripes, rings and waves are evaluated per output pixel from their
+# signed distance (in pixels, negative inside) rather than stroked with
+# ImageDraw: coverage is a one-pixel ramp across the edge, so edges are
+# anti-aliased, pixel centres are absolute frame coordinates, so bands
+# agree with the full frame, and nothing larger than the layer is built.
+# It is opt-in (--sdf): ImageDraw's C scanline fills stroke a frame's few
+# stripes, rings or waves far faster than numpy evaluates every pixel
+# (benchmark.py, pattern/*_sdf), so the aliased strokes stay the default.
+
+SDF_PATTERNS = False
+
+class SdfLayer:
+    """An RGBA layer built by compositing anti-aliased shapes, each given
+    by its signed distance field, over one another in drawing order.
+    numpy turns distances into coverage; Pillow does the compositing."""
+
+    def __init__(self, size, band=None):
+        w, h = size
+        self.top, bottom = band_rows(size, band)
+        self.layer = new_layer(size, band)
+        # Pixel (x, y) is sampled at frame point (x, y), as ImageDraw does
+        self.x = np.arange(w, dtype=np.float32)[None, :]
+        self.y = np.arange(self.top, bottom, dtype=np.float32)[:, None]
+
+    def fill(self, sd, color, y0=0):
+        """Composite `color` (r, g, b, a), or an RGBA image of per-pixel
+        colours, where the (h, w) distance field `sd` covers layer rows
+        from `y0` down."""
+        cover = np.subtract(0.5, sd, dtype=np.float32)
+        np.clip(cover, 0, 1, out=cover)
+        if isinstance(color, tuple):
+            cover *= color[3]
+            src = Image.new("RGBA", cover.shape[::-1], color)
+        else:
+            cover *= np.asarray(color.getchannel("A"))
+            src = color
+        cover += 0.5
+        src.putalpha(Image.fromarray(cover.astype(np.uint8), "L"))
+        self.layer.alpha_composite(src, (0, y0))
+
+    def image(self):
+        return self.layer
+
 # ---------------------------
 # Pattern generators (overlay layers)
 # ---------------------------
 
-def pattern_scatter_circles(size, palette):
+# Each pattern is two halves: sample_<name>(size, palette, rng) makes
+# every random choice of the layer and returns them as JSON-ready params
+# in frame units (x as a fraction of the width, y of the height, lengths
+# of the short side), and draw_<name>(size, params, band, rng) renders
+# those params at any size. rng at draw time only feeds per-pixel numpy
+# draws (dot colours). pattern_<name> does both at one size.
+
+def sample_scatter_circles(size, palette, rng=GLOBAL_RNG):
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
-    draw = ImageDraw.Draw(layer, "RGBA")
-    n = random.randint(120, 260)
+    s = min(w, h)
+    circles = []
+    n = rng.randint(120, 260)
     for _ in range(n):
-        r = random.uniform(min(w,h)*0.005, min(w,h)*0.08)
-        x = random.uniform(-r, w + r)
-        y = random.uniform(-r, h + r)
-        c = random.choice(palette)
-        a = random.randint(40, 140)
-        draw.ellipse([x-r, y-r, x+r, y+r], fill=(c[0], c[1], c[2], a))
-    return layer
+        r = rng.uniform(s*0.005, s*0.08)
+        x = rng.uniform(-r, w + r)
+        y = rng.uniform(-r, h + r)
+        c = rng.choice(palette)
+        a = rng.randint(40, 140)
+        circles.append([x / w, y / h, r / s, [c[0], c[1], c[2], a]])
+    return {"circles": circles}
 
-def pattern_stripes(size, palette):
+def draw_scatter_circles(size, params, band=None, rng=GLOBAL_RNG):
+    # Circles overlap and each replaces what is under it, so they stay as
+    # ordered ImageDraw fills: a filled ellipse is a ~40 us C call here,
+    # far cheaper than any masked composite of a stamp of the same size
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
+    s = min(w, h)
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
     draw = ImageDraw.Draw(layer, "RGBA")
-    angle = random.uniform(10, 80)
-    spacing = random.randint(int(min(w,h)*0.02), int(min(w,h)*0.06))
-    thickness = random.randint(max(2, spacing//4), spacing)
-    c = random.choice(palette)
-    col = (c[0], c[1], c[2], random.randint(40,110))
-    # Draw stripes by sweeping across a rotated canvas
+    for x, y, r, color in params["circles"]:
+        x, y, r = x * w, y * h, r * s
+        draw.ellipse([px(x-r), px(y-r) - top, px(x+r), px(y+r) - top], fill=tuple(color))
+    return layer
+
+def sample_stripes(size, palette, rng=GLOBAL_RNG):
+    s = min(size)
+    angle = rng.uniform(10, 80)
+    spacing = rng.randint(int(s*0.02), int(s*0.06))
+    thickness = rng.randint(max(2, spacing//4), spacing)
+    c = rng.choice(palette)
+    # `edge` is the extra pixel each stripe gets at this size, kept as a
+    # length so other sizes widen stripes by the same fraction of spacing
+    return {"angle": angle, "spacing": spacing / s, "thickness": thickness / s, "edge": 1 / s,
+            "color": [c[0], c[1], c[2], rng.randint(40,110)]}
+
+def draw_stripes(size, params, band=None, rng=GLOBAL_RNG):
+    w, h = size
+    s = min(w, h)
+    # Kept fractional, so the period and the stripe width relative to it
+    # are the same at every size; only the polygon corners are snapped
+    spacing = params["spacing"] * s
+    width = (params["thickness"] + params.get("edge", 1 / s)) * s
+    col = tuple(params["color"])
+    # Vertical stripes on a diag x diag square centred on the frame, turned
+    # by `angle` (counter-clockwise, like Image.rotate). Each stripe is
+    # drawn straight onto the layer as a rotated rectangle, so nothing
+    # larger than the frame is allocated or resampled.
     diag = int(math.hypot(w,h))
-    tmp = Image.new("RGBA", (diag, diag), (0,0,0,0))
-    tdraw = ImageDraw.Draw(tmp, "RGBA")
-    for x in range(0, diag+spacing, spacing):
-        tdraw.rectangle([x, 0, x+thickness, diag], fill=col)
-    tmp = tmp.rotate(angle, resample=Image.BICUBIC, expand=True)
-    # Center crop onto layer
-    x0 = (tmp.width - w)//2
-    y0 = (tmp.height - h)//2
-    layer = tmp.crop((x0, y0, x0+w, y0+h))
+    ca, sa = math.cos(math.radians(params["angle"])), math.sin(math.radians(params["angle"]))
+    if SDF_PATTERNS and np is not None:
+        # Distance across the stripes to the nearest stripe's centre line;
+        # stripe k spans u in [k*spacing, k*spacing + width]
+        sdf = SdfLayer(size, band)
+        half = width / 2
+        u = (sdf.x - w/2) * ca - (sdf.y - h/2) * sa + (diag/2 - half + spacing/2)
+        u %= spacing
+        u -= spacing/2
+        sdf.fill(np.abs(u, out=u) - half, col)
+        return sdf.image()
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
+    draw = ImageDraw.Draw(layer, "RGBA")
+    def corner(u, v):
+        u, v = u - diag/2, v - diag/2
+        return (px(w/2 + u*ca + v*sa), px(h/2 - u*sa + v*ca) - top)
+    # ImageDraw fills both edge pixels, about half a pixel more across
+    # each stripe at any size; scale that half pixel with the edge too
+    trim = (1 - params.get("edge", 1 / s) * s) / 4
+    for k in range(math.ceil((diag + spacing) / spacing)):
+        x, x1 = k * spacing + trim, k * spacing + width - trim
+        draw.polygon([corner(x, 0), corner(x1, 0), corner(x1, diag), corner(x, diag)], fill=col)
     return layer
 
-def pattern_concentric(size, palette):
+def sample_concentric(size, palette, rng=GLOBAL_RNG):
+    s = min(size)
+    max_r = math.hypot(*size)/2
+    rings = []
+    for _ in range(rng.randint(8, 20)):
+        c = rng.choice(palette)
+        a = rng.randint(30, 120)
+        thick = rng.uniform(max_r*0.005, max_r*0.03)
+        rings.append([[c[0], c[1], c[2], a], thick / s])
+    return {"rings": rings}
+
+def draw_concentric(size, params, band=None, rng=GLOBAL_RNG, loop_t=None):
+    # loop_t in [0, 1): animation phase; each ring's centre circles the
+    # frame centre once per loop, neighbouring rings in opposite directions
     w, h = size
+    s = min(w, h)
     cx, cy = w/2, h/2
-    layer = Image.new("RGBA", size, (0,0,0,0))
-    draw = ImageDraw.Draw(layer, "RGBA")
-    rings = random.randint(8, 20)
+    rings = len(params["rings"])
     max_r = math.hypot(w, h)/2
-    for i in range(rings):
+    specs = []
+    for i, (color, thick) in enumerate(params["rings"]):
         t = i / (rings - 1 + 1e-6)
         r = lerp(max_r*0.05, max_r, t)
-        c = random.choice(palette)
-        a = random.randint(30, 120)
-        thick = random.uniform(max_r*0.005, max_r*0.03)
-        draw.ellipse([cx - r, cy - r, cx + r, cy + r], outline=(c[0], c[1], c[2], a), width=int(max(1, thick)))
+        ox = oy = 0
+        if loop_t:
+            turn = math.pi * 2 * loop_t * (1 if i % 2 else -1)
+            ox, oy = max_r*0.02 * (math.cos(turn) - 1), max_r*0.02 * math.sin(turn)
+        specs.append((r, tuple(color), int(max(1, thick * s)), ox, oy))
+    if SDF_PATTERNS and np is not None:
+        return _concentric_sdf(size, band, specs, max_r)
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
+    draw = ImageDraw.Draw(layer, "RGBA")
+    for r, color, width, ox, oy in specs:
+        box = [px(cx + ox - r), px(cy + oy - r) - top, px(cx + ox + r), px(cy + oy + r) - top]
+        draw.ellipse(box, outline=color, width=width)
     return layer
 
-def pattern_triangles(size, palette):
+def _concentric_sdf(size, band, specs, max_r):
+    # Rings are evenly spaced and thinner than the spacing, so the ring
+    # covering a pixel follows from its distance to the frame centre: the
+    # first ring at least that far out, or the one before it (two lookups
+    # per pixel, whatever the ring count; five while the centres move by
+    # up to 0.04 max_r). Where strokes meet, the nearer one is drawn (the
+    # union of the distance fields). Strokes lie inside the radius, like
+    # ImageDraw outlines.
+    w, h = size
+    sdf = SdfLayer(size, band)
+    n = len(specs)
+    radius, width, ox, oy = (np.array(v, np.float32) for v in zip(*[(r, wd, ox, oy) for r, _, wd, ox, oy in specs]))
+    mid, half = radius - width / 2, width / 2
+    x, y = sdf.x - w/2, sdf.y - h/2
+    dist = np.hypot(x, y)
+    first = (dist - radius[0]) * np.float32((n - 1) / (radius[-1] - radius[0]))
+    first = np.ceil(first, out=first).clip(0, n - 1).astype(np.uint8)
+    moving = bool(ox.any() or oy.any())
+    best = np.full(dist.shape, np.inf, np.float32)
+    ring = np.zeros(dist.shape, np.uint8)
+    for k in (range(-2, 3) if moving else (-1, 0)):
+        cand = first if k == 0 else np.clip(first.astype(np.int16) + k, 0, n - 1).astype(np.uint8)
+        d = np.hypot(x - ox[cand], y - oy[cand]) if moving else dist
+        sd = np.abs(d - mid[cand])
+        sd -= half[cand]
+        nearer = sd < best
+        np.copyto(best, sd, where=nearer)
+        np.copyto(ring, cand, where=nearer)
+    colors = Image.fromarray(ring, "P")
+    colors.putpalette([v for _, color, _, _, _ in specs for v in color], "RGBA")
+    sdf.fill(best, colors.convert("RGBA"))
+    return sdf.image()
+
+def sample_triangles(size, palette, rng=GLOBAL_RNG):
+    s = min(size)
+    gx = rng.randint(6, 14)
+    gy = rng.randint(10, 20)
+    jitter = 0.4
+    # Vertex offsets as fractions of a grid cell, row by row
+    offsets = [[rng.uniform(-jitter, jitter), rng.uniform(-jitter, jitter)]
+               for _ in range((gy + 1) * (gx + 1))]
+    colors = []
+    for _ in range(2 * gx * gy):
+        c = rng.choice(palette)
+        colors.append([c[0], c[1], c[2], rng.randint(40, 120)])
+    return {"grid": [gx, gy], "offsets": offsets, "colors": colors, "blur": rng.uniform(0.5, 1.8) / s}
+
+def draw_triangles(size, params, band=None, rng=GLOBAL_RNG):
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
     draw = ImageDraw.Draw(layer, "RGBA")
-    gx = random.randint(6, 14)
-    gy = random.randint(10, 20)
+    gx, gy = params["grid"]
     sx, sy = w / gx, h / gy
-    jitter = 0.4
+    offsets = iter(params["offsets"])
     points = []
     for iy in range(gy + 1):
         row = []
         for ix in range(gx + 1):
-            jx = (random.uniform(-jitter, jitter) * sx)
-            jy = (random.uniform(-jitter, jitter) * sy)
-            row.append((ix*sx + jx, iy*sy + jy))
+            ux, uy = next(offsets)
+            row.append((px(ix*sx + ux*sx), px(iy*sy + uy*sy) - top))
         points.append(row)
     # Triangulate grid cells into two triangles each
+    colors = iter(params["colors"])
     for iy in range(gy):
         for ix in range(gx):
             p00 = points[iy][ix]
@@ -223,190 +834,1232 @@ def pattern_triangles(size, palette):
             tri1 = [p00, p10, p11]
             tri2 = [p00, p01, p11]
             for tri in (tri1, tri2):
-                c = random.choice(palette)
-                a = random.randint(40, 120)
-                draw.polygon(tri, fill=(c[0], c[1], c[2], a))
-    layer = layer.filter(ImageFilter.GaussianBlur(radius=random.uniform(0.5, 1.8)))
-    return layer
+                draw.polygon(tri, fill=tuple(next(colors)))
+    return gaussian_blur(layer, params["blur"] * min(w, h))
 
-def pattern_waves(size, palette):
+def sample_waves(size, palette, rng=GLOBAL_RNG):
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
-    draw = ImageDraw.Draw(layer, "RGBA")
-    lines = random.randint(6, 14)
-    amp = random.uniform(h*0.02, h*0.08)
-    freq = random.uniform(1.0, 3.5)
-    thickness = random.randint(2, 6)
-    for i in range(lines):
-        phase = random.uniform(0, math.pi*2)
-        c = random.choice(palette)
-        a = random.randint(60, 160)
+    lines = rng.randint(6, 14)
+    amp = rng.uniform(h*0.02, h*0.08)
+    freq = rng.uniform(1.0, 3.5)
+    thickness = rng.randint(2, 6)
+    waves = []
+    for _ in range(lines):
+        phase = rng.uniform(0, math.pi*2)
+        c = rng.choice(palette)
+        waves.append([phase, [c[0], c[1], c[2], rng.randint(60, 160)]])
+    return {"amp": amp / h, "freq": freq, "thickness": thickness / min(w, h), "lines": waves}
+
+def draw_waves(size, params, band=None, rng=GLOBAL_RNG, loop_t=None):
+    # loop_t in [0, 1): animation phase; the waves drift one wavelength
+    # per loop
+    w, h = size
+    lines = len(params["lines"])
+    amp, freq = params["amp"] * h, params["freq"]
+    thickness = max(1, round(params["thickness"] * min(w, h)))
+    specs = []
+    for i, (phase, color) in enumerate(params["lines"]):
+        if loop_t:
+            phase -= math.pi * 2 * loop_t
         y0 = int(lerp(h*0.1, h*0.9, i/(lines-1 + 1e-6)))
+        specs.append((y0, phase, tuple(color)))
+    if SDF_PATTERNS and np is not None:
+        return _waves_sdf(size, band, specs, amp, freq, thickness)
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
+    draw = ImageDraw.Draw(layer, "RGBA")
+    for y0, phase, color in specs:
         pts = []
         for x in range(-w//10, w + w//10, max(2, w//300)):
             y = y0 + math.sin((x / w) * math.pi * 2 * freq + phase) * amp
-            pts.append((x, y))
-        draw.line(pts, fill=(c[0], c[1], c[2], a), width=thickness, joint="curve")
+            pts.append((x, px(y) - top))
+        draw.line(pts, fill=color, width=thickness, joint="curve")
     return layer
 
-def pattern_soft_blobs(size, palette):
+def _waves_sdf(size, band, specs, amp, freq, thickness):
+    # Distance to each sine is its vertical distance over sqrt(1 + slope^2)
+    # (exact to first order, and the waves are gentle); each line is only
+    # evaluated over the rows it can reach
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
-    blobs = random.randint(6, 16)
-    for _ in range(blobs):
-        r = random.uniform(min(w,h)*0.08, min(w,h)*0.25)
-        x = random.uniform(r*0.8, w - r*0.8)
-        y = random.uniform(r*0.8, h - r*0.8)
-        c = random.choice(palette)
-        a = random.randint(80, 160)
-        blob = Image.new("RGBA", (int(r*2.5), int(r*2.5)), (0,0,0,0))
-        bdraw = ImageDraw.Draw(blob, "RGBA")
-        bdraw.ellipse([0,0,blob.width,blob.height], fill=(c[0], c[1], c[2], a))
-        blob = blob.filter(ImageFilter.GaussianBlur(radius=r*0.35))
-        layer.alpha_composite(blob, (int(x - blob.width/2), int(y - blob.height/2)))
-    layer = layer.filter(ImageFilter.GaussianBlur(radius=random.uniform(1.0, 2.5)))
-    return layer
+    sdf = SdfLayer(size, band)
+    top, bottom = sdf.top, sdf.top + sdf.y.shape[0]
+    k = math.pi * 2 * freq / w
+    reach = amp + thickness
+    for y0, phase, color in specs:
+        r0, r1 = max(top, int(y0 - reach)), min(bottom, int(math.ceil(y0 + reach)) + 1)
+        if r0 >= r1:
+            continue
+        arg = sdf.x * k + phase
+        curve = y0 + np.sin(arg) * amp
+        scale = 1 / np.sqrt(1 + (np.cos(arg) * (amp * k)) ** 2)
+        sd = np.abs(sdf.y[r0 - top:r1 - top] - curve) * scale - thickness / 2
+        sdf.fill(sd, color, r0 - top)
+    return sdf.image()
+
+def _blob(side, color, radius):
+    blob = Image.new("RGBA", (side, side), (0,0,0,0))
+    bdraw = ImageDraw.Draw(blob, "RGBA")
+    bdraw.ellipse([0,0,blob.width,blob.height], fill=color)
+    return gaussian_blur(blob, radius)
+
+def sample_soft_blobs(size, palette, rng=GLOBAL_RNG):
+    w, h = size
+    s = min(w, h)
+    blobs = []
+    for _ in range(rng.randint(6, 16)):
+        r = rng.uniform(s*0.08, s*0.25)
+        x = rng.uniform(r*0.8, w - r*0.8)
+        y = rng.uniform(r*0.8, h - r*0.8)
+        c = rng.choice(palette)
+        blobs.append([x / w, y / h, r / s, [c[0], c[1], c[2], rng.randint(80, 160)]])
+    return {"blobs": blobs, "blur": rng.uniform(1.0, 2.5) / s}
+
+def draw_soft_blobs(size, params, band=None, rng=GLOBAL_RNG, loop_t=None):
+    # loop_t in [0, 1): animation phase; each blob floats out along its
+    # own direction and back once per loop. The blurred blobs don't change
+    # between frames, so animated calls keep them in FIELD_CACHE.
+    w, h = size
+    s = min(w, h)
+    top, bottom = band_rows(size, band)
+    layer = new_layer(size, band)
+    for i, (x, y, r, color) in enumerate(params["blobs"]):
+        x, y, r, color = x * w, y * h, r * s, tuple(color)
+        if loop_t:
+            angle = i * 2.39996  # golden angle spreads the directions
+            drift = r * 0.3 * math.sin(math.pi * 2 * loop_t)
+            x, y = x + drift * math.cos(angle), y + drift * math.sin(angle)
+        side = int(r*2.5)
+        by = int(y - side/2)
+        if by >= bottom or by + side <= top:
+            continue
+        if loop_t is None:
+            blob = _blob(side, color, r*0.35)
+        else:
+            blob = FIELD_CACHE.get(("blob", side, color, r), lambda: _blob(side, color, r*0.35))
+        layer.alpha_composite(blob, (int(x - side/2), by - top))
+    return gaussian_blur(layer, params["blur"] * s)
+
+def sample_dots(size, palette, rng=GLOBAL_RNG):
+    w, h = size
+    s = min(w, h)
+    spacing = rng.randint(int(s*0.02), int(s*0.05))
+    offset = rng.choice([0, spacing//2])
+    # The colour grid is drawn at draw time (numpy), at the cell count of
+    # this size, so other sizes reuse the same colours cell for cell
+    cells = [len(range(0, h + spacing, spacing)) + 1, len(range(offset, w + spacing, spacing)) + 1]
+    # `edge`: the extra pixel across each dot at this size (see sample_stripes)
+    return {"spacing": spacing / s, "offset": offset / s, "edge": 1 / s, "cells": cells,
+            "palette": [list(c) for c in palette]}
 
-def pattern_dots(size, palette):
+def draw_dots(size, params, band=None, rng=GLOBAL_RNG):
+    if np is None:
+        return _dots_draw(size, params, band, rng)
     w, h = size
-    layer = Image.new("RGBA", size, (0,0,0,0))
+    s = min(w, h)
+    top, bottom = band_rows(size, band)
+    spacing = max(1, round(params["spacing"] * s))
+    offset = round(params["offset"] * s)
+    # The radius follows the unrounded spacing, so dots keep their size
+    # relative to the grid at every scale
+    r = (params["spacing"] / 4 + params.get("edge", 1 / s) / 2) * s
+    # Dots never overlap (r <= spacing/4 + 1/2), so the layer is a grid of
+    # spacing x spacing cells with one stamp in each centre. All stamp
+    # pixels of all cells are written in one scatter as packed RGBA words,
+    # then the frame is cut out of the grid.
+    ny = len(range(0, h + spacing, spacing)) + 1
+    nx = len(range(offset, w + spacing, spacing)) + 1
+    stamp = disc_stamp(r)
+    k, c = stamp.shape[0] // 2, spacing // 2
+    # At tiny sizes the rim can be wider than the cell; trim it to fit
+    trim = max(0, k - min(c, spacing - 1 - c))
+    stamp, k = stamp[trim:stamp.shape[0] - trim, trim:stamp.shape[1] - trim], k - trim
+    ys, xs = np.nonzero(stamp)
+    cover = stamp[ys, xs].astype("<u4")[:, None, None]
+    palette = params["palette"]
+    pal = np.asarray(palette, dtype="<u4")
+    packed = pal[:, 0] | pal[:, 1] << 8 | pal[:, 2] << 16
+    cells = tuple(params["cells"])
+    rgb = packed[rng.np.randint(0, len(palette), cells)]
+    alpha = rng.np.randint(40, 141, cells).astype("<u4")
+    if cells != (ny, nx):
+        # Another size than the one sampled: repeat the sampled grid
+        rows, cols = np.arange(ny) % cells[0], np.arange(nx) % cells[1]
+        rgb, alpha = rgb[rows][:, cols], alpha[rows][:, cols]
+    # Cell (0, 0) is centred on the first dot at (offset, 0); only the cell
+    # rows that reach the band are built
+    r0 = (top + c) // spacing
+    r1 = min(ny, (bottom + c) // spacing + 1)
+    grid = np.zeros((r1 - r0, spacing, nx, spacing), dtype="<u4")
+    grid[:, ys + c - k, :, xs + c - k] = (rgb | (alpha * cover + 127) // 255 << 24)[:, r0:r1]
+    layer = Image.frombuffer("RGBA", (nx * spacing, (r1 - r0) * spacing), grid, "raw", "RGBA", 0, 1)
+    y0 = top + c - r0 * spacing
+    return layer.crop((c - offset, y0, c - offset + w, y0 + bottom - top))
+
+def _dots_draw(size, params, band=None, rng=GLOBAL_RNG):
+    # One ImageDraw call per dot, colours from the scalar stream; used
+    # without numpy and as the benchmark reference
+    w, h = size
+    s = min(w, h)
+    top = band_rows(size, band)[0]
+    layer = new_layer(size, band)
     draw = ImageDraw.Draw(layer, "RGBA")
-    spacing = random.randint(int(min(w,h)*0.02), int(min(w,h)*0.05))
-    r = max(1, spacing//4)
-    offset = random.choice([0, spacing//2])
+    spacing = max(1, round(params["spacing"] * s))
+    offset = round(params["offset"] * s)
+    # ImageDraw adds a pixel across the ellipse; r is the radius of
+    # draw_dots less that half pixel
+    r = (params["spacing"] / 4 + params.get("edge", 1 / s) / 2) * s - 0.5
     for y in range(0, h+spacing, spacing):
         for x in range(offset, w+spacing, spacing):
-            c = random.choice(palette)
-            a = random.randint(40, 140)
-            draw.ellipse([x-r, y-r, x+r, y+r], fill=(c[0], c[1], c[2], a))
+            c = rng.choice(params["palette"])
+            a = rng.randint(40, 140)
+            draw.ellipse([px(x-r), px(y-r)-top, px(x+r), px(y+r)-top], fill=(c[0], c[1], c[2], a))
     return layer
 
-def subtle_vignette(img, strength=0.25):
-    w, h = img.size
-    vignette = bg_radial_gradient((w,h), (0,0,0), (0,0,0))
-    mask = Image.new("L", (w,h), 0)
-    # Create mask where edges are darker
-    m = Image.new("L", (w,h), 0)
-    md = ImageDraw.Draw(m)
-    md.rectangle([0,0,w,h], fill=255)
-    blur = int(min(w,h)*0.08)
-    vignette = vignette.filter(ImageFilter.GaussianBlur(radius=blur))
-    # Blend by multiplying with a factor
-    dark = Image.new("RGB", (w,h), (0,0,0))
-    return Image.blend(img, ImageChops.multiply(img, ImageEnhance.Brightness(vignette).enhance(1.5)), strength)
-
-def add_grain(img, amount=0.06):
+def _pattern_dots_draw(size, palette, band=None, rng=GLOBAL_RNG):
+    return _dots_draw(size, sample_dots(size, palette, rng), band, rng)
+
+# name: (sample, draw), in the order render_layers shuffles them
+PATTERNS = OrderedDict([
+    ("scatter_circles", (sample_scatter_circles, draw_scatter_circles)),
+    ("stripes", (sample_stripes, draw_stripes)),
+    ("concentric", (sample_concentric, draw_concentric)),
+    ("triangles", (sample_triangles, draw_triangles)),
+    ("waves", (sample_waves, draw_waves)),
+    ("soft_blobs", (sample_soft_blobs, draw_soft_blobs)),
+    ("dots", (sample_dots, draw_dots)),
+])
+
+def pattern_scatter_circles(size, palette, band=None, rng=GLOBAL_RNG):
+    return draw_scatter_circles(size, sample_scatter_circles(size, palette, rng), band, rng)
+
+def pattern_stripes(size, palette, band=None, rng=GLOBAL_RNG):
+    return draw_stripes(size, sample_stripes(size, palette, rng), band, rng)
+
+def pattern_concentric(size, palette, band=None, rng=GLOBAL_RNG, loop_t=None):
+    return draw_concentric(size, sample_concentric(size, palette, rng), band, rng, loop_t)
+
+def pattern_triangles(size, palette, band=None, rng=GLOBAL_RNG):
+    return draw_triangles(size, sample_triangles(size, palette, rng), band, rng)
+
+def pattern_waves(size, palette, band=None, rng=GLOBAL_RNG, loop_t=None):
+    return draw_waves(size, sample_waves(size, palette, rng), band, rng, loop_t)
+
+def pattern_soft_blobs(size, palette, band=None, rng=GLOBAL_RNG, loop_t=None):
+    return draw_soft_blobs(size, sample_soft_blobs(size, palette, rng), band, rng, loop_t)
+
+def pattern_dots(size, palette, band=None, rng=GLOBAL_RNG):
+    return draw_dots(size, sample_dots(size, palette, rng), band, rng)
+
+def vignette_mask(size, inner=0.4, outer=1.0, band=None):
+    """Vignette weight as an "L" image, cached per (size, inner, outer).
+
+    0 inside `inner`, smoothstep up to 255 at `outer`. Radii are measured
+    on an ellipse fitted to the frame, 1.0 at the corners, so tall phone
+    sizes darken their long edges too. The falloff is smooth, so it is evaluated on a
+    small grid and upsampled instead of blurred at full resolution. The
+    returned image is shared between callers; don't draw on it. With
+    `band` only those rows are upsampled, and not cached.
+    """
+    small = FIELD_CACHE.get(("vignette-grid", size, inner, outer),
+                            lambda: _vignette_grid(size, inner, outer))
+    if band is not None:
+        y0, y1 = band
+        gh = small.height / size[1]
+        return small.resize((size[0], y1 - y0), Image.BICUBIC,
+                            box=(0, y0 * gh, small.width, y1 * gh))
+    return FIELD_CACHE.get(("vignette", size, inner, outer),
+                           lambda: small.resize(size, Image.BICUBIC))
+
+def _vignette_grid(size, inner, outer):
+    w, h = size
+    gw = max(2, round(128 * w / max(w, h)))
+    gh = max(2, round(128 * h / max(w, h)))
+    data = []
+    for gy in range(gh):
+        y = (gy + 0.5) / gh - 0.5
+        for gx in range(gw):
+            x = (gx + 0.5) / gw - 0.5
+            t = (math.hypot(x, y) * math.sqrt(2) - inner) / (outer - inner)
+            t = min(1.0, max(0.0, t))
+            data.append(int(255 * t * t * (3 - 2 * t) + 0.5))
+    small = Image.new("L", (gw, gh))
+    small.putdata(data)
+    return small
+
+def subtle_vignette(img, strength=0.25, inner=0.4, outer=1.0, size=None, y0=0):
+    """Darken towards the corners by up to `strength`.
+
+    `size` and `y0` place `img` in a larger frame when it is one band of
+    a tiled render.
+    """
+    band = None if size is None else (y0, y0 + img.height)
+    weight = vignette_mask(size or img.size, inner, outer, band)
+    shade = weight.point([255 - int(v * strength + 0.5) for v in range(256)])
+    return ImageChops.multiply(img, Image.merge("RGB", (shade, shade, shade)))
+
+def add_grain(img, amount=0.06, sigma=None, y0=0, rng=GLOBAL_RNG):
     if amount <= 0:
         return img
+    if sigma is None:
+        sigma = rng.randint(40, 90)
     w, h = img.size
-    noise = Image.effect_noise((w, h), random.randint(40, 90))
+    noise = noise_image((w, h), sigma, y0, rng)
     noise = ImageEnhance.Contrast(noise).enhance(1.4)
     noise = ImageEnhance.Brightness(noise).enhance(1.0)
     noise_rgb = Image.merge("RGB", (noise, noise, noise))
     return ImageChops.blend(img, noise_rgb, amount)
 
+# ---------------------------
+# Float compositing (engine="numpy")
+# ---------------------------
+# The canvas is a float32 (H, W, 4) array in 0..1 for the whole pipeline.
+# Every op mirrors its PIL counterpart so the two engines can be
+# compared image for image; the only difference is that nothing is
+# requantized to 8 bits until to_image().
+
+def to_float(img):
+    return np.asarray(img.convert("RGBA"), dtype=np.float32) * np.float32(1 / 255)
+
+def to_image(canvas):
+    rgb = canvas * 255.0
+    np.clip(rgb, 0, 255, out=rgb)
+    return Image.fromarray(np.rint(rgb[..., :3]).astype(np.uint8), "RGB")
+
+def _luma(canvas):
+    # ITU-R 601, the weights PIL uses for convert("L")
+    return canvas[..., 0] * 0.299 + canvas[..., 1] * 0.587 + canvas[..., 2] * 0.114
+
+def np_blend_layer(canvas, layer, mode, opacity):
+    """Blend a float RGBA layer onto the float canvas in place.
+
+    `layer` is used as scratch space. The math runs over all four channels
+    of the contiguous arrays (several times faster than strided RGB views)
+    and the canvas alpha is put back afterwards where the mode keeps it.
+    """
+    if mode == "normal":
+        # Image.blend against transparent black scales the layer colour as
+        # well as its alpha, so opacity reaches the colour twice; kept so
+        # both engines agree.
+        src_a = layer[..., 3:] * opacity
+        keep = canvas[..., 3:] * (1 - src_a)
+        out_a = src_a + keep
+        canvas *= keep
+        layer *= opacity * src_a
+        canvas += layer
+        canvas *= 1 / np.maximum(out_a, 1e-6)
+        canvas[..., 3:] = out_a
+        return canvas
+
+    # Like layer.convert("RGB"), the layer colour is used without its alpha
+    alpha = canvas[..., 3].copy()
+    base, top = canvas, layer
+    if mode == "multiply":
+        top *= base
+    elif mode == "screen":
+        prod = base * top
+        top += base
+        top -= prod
+    elif mode == "overlay":
+        prod = base * top
+        low = prod * 2
+        top += base
+        top *= 2
+        top -= low
+        top -= 1
+        np.copyto(top, low, where=base < 0.5)
+    elif mode == "softlight":
+        # (1 - b) * b * t + b * screen(b, t), expanded
+        top *= 2 * base
+        top *= 1 - base
+        top += base * base
+    elif mode == "add":
+        top += base
+    elif mode == "subtract":
+        np.subtract(base, top, out=top)
+    else:
+        return canvas
+    np.clip(top, 0, 1, out=top)
+    top -= base
+    top *= opacity
+    base += top
+    base[..., 3] = alpha
+    return canvas
+
+def np_gaussian_blur(canvas, radius):
+    """Separable Gaussian blur with edge extension, sigma = radius like PIL."""
+    half = max(1, int(math.ceil(radius * 3)))
+    k = np.exp(-0.5 * (np.arange(-half, half + 1) / max(radius, 1e-6)) ** 2)
+    k = (k / k.sum()).astype(np.float32)
+    for axis in (0, 1):
+        pad = [(0, 0)] * canvas.ndim
+        pad[axis] = (half, half)
+        src = np.pad(canvas, pad, mode="edge")
+        out = np.zeros_like(canvas)
+        n = canvas.shape[axis]
+        window = [slice(None)] * canvas.ndim
+        for i, weight in enumerate(k):
+            window[axis] = slice(i, i + n)
+            out += weight * src[tuple(window)]
+        canvas = out
+    return canvas
+
+# Post FX only feed to_image(), which drops alpha, so they run over all
+# four channels and leave whatever lands in the alpha plane.
+
+def np_contrast(canvas, factor):
+    mean = float(_luma(canvas).mean())
+    canvas -= mean
+    canvas *= factor
+    canvas += mean
+    np.clip(canvas, 0, 1, out=canvas)
+    return canvas
+
+def np_color(canvas, factor):
+    grey = _luma(canvas)[..., None]
+    canvas -= grey
+    canvas *= factor
+    canvas += grey
+    np.clip(canvas, 0, 1, out=canvas)
+    return canvas
+
+def np_grain(canvas, amount, sigma=None, rng=GLOBAL_RNG):
+    """Float version of add_grain."""
+    if sigma is None:
+        sigma = rng.randint(40, 90)
+    h, w = canvas.shape[:2]
+    noise = np.asarray(noise_image((w, h), sigma, rng=rng), dtype=np.float32) / 255
+    mean = noise.mean()
+    noise -= mean
+    noise *= 1.4
+    noise += mean
+    np.clip(noise, 0, 1, out=noise)
+    canvas *= 1 - amount
+    noise *= amount
+    canvas += noise[..., None]
+    return canvas
+
+def np_vignette(canvas, strength, inner=0.4, outer=1.0):
+    """Float version of subtle_vignette."""
+    h, w = canvas.shape[:2]
+    shade = np.asarray(vignette_mask((w, h), inner, outer), dtype=np.float32)
+    shade *= -strength / 255
+    shade += 1
+    canvas *= shade[..., None]
+    return canvas
+
+def np_post_fx(canvas, fx, rng=GLOBAL_RNG):
+    """Float version of apply_post_fx; quantizes and returns an RGB image."""
+    if fx["grain"]:
+        traced("grain", np_grain, canvas, *fx["grain"], rng=rng)
+    if fx["vignette"]:
+        traced("vignette", np_vignette, canvas, fx["vignette"])
+    traced("contrast", np_contrast, canvas, fx["contrast"])
+    traced("color", np_color, canvas, fx["color"])
+    return traced("quantize", to_image, canvas)
+
 # ---------------------------
 # Composer
 # ---------------------------
 
-def compose_wallpaper(size=None, seed=None):
-    if seed is not None:
-        random.seed(seed)
-        if np is not None:
-            np.random.seed(seed)
+def blend_layer(comp, layer, mode, opacity):
+    """Blend an RGBA layer onto the RGBA canvas with ImageChops."""
+    if mode == "normal":
+        clear = Image.new("RGBA", comp.size, (0,0,0,0))
+        return Image.alpha_composite(comp, Image.blend(clear, layer, opacity))
+    # Convert to RGB for blend ops then reattach alpha
+    base_rgb = comp.convert("RGB")
+    lay_rgb = layer.convert("RGB")
+    if mode == "multiply":
+        blended = ImageChops.multiply(base_rgb, lay_rgb)
+    elif mode == "screen":
+        blended = ImageChops.screen(base_rgb, lay_rgb)
+    elif mode == "overlay":
+        blended = ImageChops.overlay(base_rgb, lay_rgb)
+    elif mode == "softlight":
+        blended = ImageChops.soft_light(base_rgb, lay_rgb)
+    elif mode == "add":
+        blended = ImageChops.add(base_rgb, lay_rgb, scale=1.0, offset=0)
+    elif mode == "subtract":
+        blended = ImageChops.subtract(base_rgb, lay_rgb, scale=1.0, offset=0)
+    else:
+        blended = base_rgb
+
+    blended = ImageChops.blend(base_rgb, blended, opacity)
+    return Image.merge("RGBA", (*blended.split(), comp.split()[-1]))
+
+def sample_post_fx(rng=GLOBAL_RNG):
+    """Draw the post-FX parameters (grain, vignette, contrast, colour)."""
+    fx = {"grain": None, "vignette": None}
+    if rng.random() < 0.9:
+        fx["grain"] = (rng.uniform(0.03, 0.08), rng.randint(40, 90))
+    if rng.random() < 0.7:
+        fx["vignette"] = rng.uniform(0.08, 0.2)
+    fx["contrast"] = rng.uniform(1.02, 1.12)
+    fx["color"] = rng.uniform(1.02, 1.15)
+    return fx
+
+def apply_post_fx(img, fx, rng=GLOBAL_RNG):
+    return apply_contrast_color(apply_grain_vignette(img, fx, rng=rng), fx)
+
+def apply_grain_vignette(img, fx, size=None, y0=0, rng=GLOBAL_RNG):
+    """The position-dependent post FX; `size`/`y0` as in subtle_vignette."""
+    if fx["grain"]:
+        img = traced("grain", add_grain, img, *fx["grain"], y0=y0, rng=rng)
+    if fx["vignette"]:
+        img = traced("vignette", subtle_vignette, img, strength=fx["vignette"], size=size, y0=y0)
+    return img
+
+def apply_contrast_color(img, fx, mean=None):
+    """Slight contrast and colour pop.
+
+    Contrast pivots on the mean luma; pass the whole frame's `mean`
+    (as ImageEnhance rounds it) when `img` is only one band.
+    """
+    with stage("contrast"):
+        if mean is None:
+            img = ImageEnhance.Contrast(img).enhance(fx["contrast"])
+        else:
+            img = Image.blend(Image.new("RGB", img.size, (mean, mean, mean)), img, fx["contrast"])
+    with stage("color"):
+        return ImageEnhance.Color(img).enhance(fx["color"])
+
+def post_process(img, fx, engine="pil", rng=GLOBAL_RNG):
+    """Apply post FX to an RGB image with either engine."""
+    if engine == "numpy":
+        return np_post_fx(to_float(img), fx, rng)
+    return apply_post_fx(img, fx, rng)
+
+def apply_layer(comp, layer, mode, opacity, blur=None, engine="pil", name=None):
+    """Blend a pattern layer onto the canvas, then soften the result with
+    a `blur` radius if one is given. Returns the canvas."""
+    info = {"pattern": name, "opacity": opacity}
+    if engine == "numpy":
+        traced("blend/" + mode, np_blend_layer, comp, to_float(layer), mode, opacity, info=info)
+    else:
+        comp = traced("blend/" + mode, blend_layer, comp, layer, mode, opacity, info=info)
+    if blur is not None:
+        comp = gaussian_blur(comp, blur)
+    return comp
+
+# A scene is every random choice of one wallpaper, made up front and
+# kept as plain JSON: palette, background, paper strength, pattern layers
+# (params in frame units, see PATTERNS), blend modes, opacities, blurs
+# and post FX. It renders at any size; per-pixel noise (paper, grain, dot
+# colours) comes from its seed at render time. Sampled with a seed's
+# RenderRng at the size it was designed for, it renders that seed's
+# wallpaper exactly.
 
+SCENE_VERSION = 1
+BLEND_MODES = ["normal","multiply","screen","overlay","softlight","add","subtract"]
+
+def sample_scene(size=None, seed=None, rng=None):
+    """Make every random choice of one wallpaper, drawing nothing.
+
+    Draws from `rng` (default RenderRng(seed); a fresh seed if both are
+    None, so the scene replays) exactly as rendering the wallpaper did.
+    `size` is the frame the scene is designed for (a random phone size if
+    None); it fixes the aspect ratio and the unit of every length.
+    """
+    if rng is None:
+        seed = seed if seed is not None else random.randrange(2**31)
+        rng = RenderRng(seed)
     if size is None:
-        size = random_phone_size()
+        size = random_phone_size(rng)
     w, h = size
+    s = min(w, h)
+    palette = choose_palette(rng)
+    kind = rng.choice(["linear","radial"])
+    background = {"kind": kind, "colors": [list(rng.choice(palette)), list(rng.choice(palette))]}
+    if kind == "linear":
+        background["angle"] = rng.uniform(0,360)
+    paper = rng.uniform(0.04, 0.12)
+
+    # Choose 2–4 patterns from the set
+    patterns = list(PATTERNS)
+    rng.shuffle(patterns)
+    layers = []
+    for name in patterns[:rng.randint(2, 4)]:
+        params = PATTERNS[name][0]((w,h), palette, rng)
+        # Random blend mode
+        mode = rng.choice(BLEND_MODES)
+        opacity = rng.uniform(0.25, 0.85)
+        # Occasionally soften the layer transitions
+        blur = rng.uniform(0.2, 0.8) if rng.random() < 0.5 else None
+        layers.append({"pattern": name, "params": params, "mode": mode, "opacity": opacity,
+                       "blur": None if blur is None else blur / s})
+    fx = sample_post_fx(rng)
+    if fx["grain"]:
+        fx["grain"] = list(fx["grain"])
+    return {"version": SCENE_VERSION, "seed": seed, "size": [w, h], "palette": [list(c) for c in palette],
+            "background": background, "paper": paper, "layers": layers, "fx": fx}
 
-    palette = choose_palette()
-    bg_choice = random.choice(["linear","radial"])
-    if bg_choice == "linear":
-        bg = bg_linear_gradient(size, random.choice(palette), random.choice(palette), angle_deg=random.uniform(0,360))
+def scene_layers(scene, size=None, engine="pil", band=None, rng=None, record=None):
+    """Render a scene's background and pattern layers at `size` (the
+    scene's own size if None): (canvas, fx) as render_layers returns.
+
+    `rng` feeds the per-pixel noise (default RenderRng(scene["seed"])).
+    With a `record` list, each pattern layer appends what is needed to
+    redraw and re-blend it later (AnimatedWallpaper): its name, draw
+    function and params, the rendered layer, its blend mode, opacity and
+    blur, and the canvas below it.
+    """
+    if engine == "numpy" and np is None:
+        raise RuntimeError("engine='numpy' requires numpy")
+    if scene.get("version") != SCENE_VERSION:
+        raise ValueError(f"unsupported scene version {scene.get('version')!r}")
+    if rng is None:
+        rng = RenderRng(scene["seed"])
+    size = tuple(size or scene["size"])
+    s = min(size)
+    # Below the designed size each pixel stands for several, whose noise
+    # would average out; scale the noise down to match
+    detail = min(1.0, s / min(scene["size"]))
+    fx = scene["fx"]
+    if fx["grain"] and detail < 1:
+        fx = dict(fx, grain=[fx["grain"][0], fx["grain"][1] * detail])
+    bg = scene["background"]
+    c1, c2 = (tuple(c) for c in bg["colors"])
+    if bg["kind"] == "linear":
+        img = traced("background/linear", bg_linear_gradient, size, c1, c2,
+                     angle_deg=bg["angle"], band=band, rng=rng)
     else:
-        bg = bg_radial_gradient(size, random.choice(palette), random.choice(palette))
+        img = traced("background/radial", bg_radial_gradient, size, c1, c2, band=band)
+    img = traced("paper_texture", add_paper_texture, img, strength=scene["paper"],
+                 y0=band_rows(size, band)[0], rng=rng, sigma=100 * detail)
+    comp = to_float(img) if engine == "numpy" else img.convert("RGBA")
 
-    bg = add_paper_texture(bg, strength=random.uniform(0.04, 0.12))
+    for spec in scene["layers"]:
+        name, params = spec["pattern"], spec["params"]
+        draw = PATTERNS[name][1]
+        layer = traced("pattern/" + name, draw, size, params, band=band, rng=rng)
+        blur = None if spec["blur"] is None else spec["blur"] * s
+        if record is not None:
+            below = comp.copy() if engine == "numpy" else comp
+            record.append({"name": name, "draw": draw, "params": params,
+                           "layer": layer, "mode": spec["mode"], "opacity": spec["opacity"], "blur": blur,
+                           "below": below})
+        comp = apply_layer(comp, layer, spec["mode"], spec["opacity"], blur, engine, name)
+    return comp, fx
 
-    # Choose 2–4 patterns from the set
-    patterns = [
-        pattern_scatter_circles,
-        pattern_stripes,
-        pattern_concentric,
-        pattern_triangles,
-        pattern_waves,
-        pattern_soft_blobs,
-        pattern_dots,
-    ]
-    random.shuffle(patterns)
-    n_layers = random.randint(2, 4)
-    comp = bg.convert("RGBA")
+def render_scene(scene, size=None, engine="pil", rng=None):
+    """The finished wallpaper of a scene at `size` (default its own)."""
+    rng = rng or RenderRng(scene["seed"])
+    with stage("render_scene", seed=scene["seed"], engine=engine) as info:
+        comp, fx = scene_layers(scene, size, engine=engine, rng=rng)
+        if engine == "numpy":
+            img = np_post_fx(comp, fx, rng)
+        else:
+            img = apply_post_fx(comp.convert("RGB"), fx, rng)
+        info["size"] = list(img.size)
+    return img
 
-    for i in range(n_layers):
-        pat_func = patterns[i]
-        layer = pat_func((w,h), palette)
-        # Random blend mode
-        mode = random.choice(["normal","multiply","screen","overlay","softlight","add","subtract"])
-        opacity = random.uniform(0.25, 0.85)
+def preview_size(scene, max_side=256):
+    """The scene's aspect ratio scaled to fit in max_side x max_side."""
+    w, h = scene["size"]
+    k = max_side / max(w, h)
+    return (max(1, round(w * k)), max(1, round(h * k)))
 
-        if mode == "normal":
-            base = comp
-            comp = Image.alpha_composite(base, Image.blend(Image.new("RGBA",(w,h),(0,0,0,0)), layer, opacity))
+def render_preview(scene, max_side=256, supersample=2, engine="pil"):
+    """A thumbnail of the scene, rendered at `supersample` times its size
+    and reduced, so stripes and dots a few pixels apart keep their
+    coverage instead of aliasing."""
+    w, h = preview_size(scene, max_side)
+    img = render_scene(scene, (w * supersample, h * supersample), engine=engine)
+    return img.reduce(supersample) if supersample > 1 else img
+
+def save_scene(scene, path):
+    with open(path, "w") as f:
+        json.dump(scene, f)
+    return path
+
+def load_scene(path):
+    with open(path) as f:
+        return json.load(f)
+
+def render_layers(size=None, seed=None, engine="pil", band=None, rng=None, record=None):
+    """Render background and pattern layers and draw the post-FX params.
+
+    Returns (canvas, fx): an RGBA image for engine="pil" or a float32
+    (H, W, 4) array for engine="numpy", and the sample_post_fx() dict.
+    Every draw comes from `rng` (default RenderRng(seed)), so renders on
+    other threads or in other order don't change the result. Both
+    engines consume the RNG in the same order, so a seed gives the same
+    design on either. With `band` only those rows are rendered; the RNG
+    is consumed exactly as for the full frame. `record` is as for
+    scene_layers.
+    """
+    if rng is None:
+        rng = RenderRng(seed)
+    scene = sample_scene(size, seed, rng)
+    return scene_layers(scene, engine=engine, band=band, rng=rng, record=record)
+
+def compose_wallpaper(size=None, seed=None, engine="pil", rng=None):
+    """Render one wallpaper from `seed` (or an explicit RenderRng).
+
+    engine="pil" composites layer by layer with ImageChops; engine="numpy"
+    keeps the canvas as one float32 (H, W, 4) array and quantizes once at
+    the end.
+    """
+    rng = rng or RenderRng(seed)
+    with stage("compose", seed=seed, engine=engine) as info:
+        comp, fx = render_layers(size, engine=engine, rng=rng)
+        if engine == "numpy":
+            img = np_post_fx(comp, fx, rng)
         else:
-            # Convert to RGB for blend ops then reattach alpha
-            base_rgb = comp.convert("RGB")
-            lay_rgb = layer.convert("RGB")
-            if mode == "multiply":
-                blended = ImageChops.multiply(base_rgb, lay_rgb)
-            elif mode == "screen":
-                blended = ImageChops.screen(base_rgb, lay_rgb)
-            elif mode == "overlay":
-                blended = ImageChops.overlay(base_rgb, lay_rgb)
-            elif mode == "softlight":
-                blended = ImageChops.soft_light(base_rgb, lay_rgb)
-            elif mode == "add":
-                blended = ImageChops.add(base_rgb, lay_rgb, scale=1.0, offset=0)
-            elif mode == "subtract":
-                blended = ImageChops.subtract(base_rgb, lay_rgb, scale=1.0, offset=0)
-            else:
-                blended = base_rgb
+            img = apply_post_fx(comp.convert("RGB"), fx, rng)
+        info["size"] = list(img.size)
+    return img
 
-            blended = ImageChops.blend(base_rgb, blended, opacity)
-            comp = Image.merge("RGBA", (*blended.split(), comp.split()[-1]))
+# ---------------------------
+# Multi-size export
+# ---------------------------
 
-        # Occasionally soften the layer transitions
-        if random.random() < 0.5:
-            comp = comp.filter(ImageFilter.GaussianBlur(radius=random.uniform(0.2, 0.8)))
-
-    out = comp.convert("RGB")
-    # Post FX
-    if random.random() < 0.9:
-        out = add_grain(out, amount=random.uniform(0.03, 0.08))
-    if random.random() < 0.7:
-        out = subtle_vignette(out, strength=random.uniform(0.08, 0.2))
-    # Slight contrast pop
-    out = ImageEnhance.Contrast(out).enhance(random.uniform(1.02, 1.12))
-    out = ImageEnhance.Color(out).enhance(random.uniform(1.02, 1.15))
+def crop_offset(profile, window):
+    """Start of the `window`-long span of `profile` holding the most detail.
+
+    A mild pull towards the middle keeps centred designs centred when
+    the detail is spread evenly.
+    """
+    n = len(profile)
+    if window >= n:
+        return 0
+    sums = np.convolve(profile, np.ones(window), mode="valid")
+    centre = np.abs(np.linspace(-1, 1, len(sums)))
+    return int(np.argmax(sums * (1 - 0.25 * centre)))
+
+def fit_to_size(img, size, smart=True):
+    """Scale `img` to cover `size`, then crop the surplus axis.
+
+    With smart=True (and numpy) the crop window follows the edge energy
+    of a small thumbnail; otherwise it is centred.
+    """
+    tw, th = size
+    sw, sh = img.size
+    scale = max(tw / sw, th / sh)
+    cw, ch = tw / scale, th / scale
+    x0, y0 = (sw - cw) / 2, (sh - ch) / 2
+    if smart and np is not None and (cw < sw - 1 or ch < sh - 1):
+        thumb_scale = 256 / max(sw, sh)
+        thumb = img.convert("L").resize((max(1, round(sw * thumb_scale)),
+                                         max(1, round(sh * thumb_scale))), Image.BILINEAR)
+        energy = np.asarray(thumb.filter(ImageFilter.FIND_EDGES), dtype=np.float32)
+        if cw < sw - 1:
+            x0 = crop_offset(energy.sum(axis=0), max(1, round(cw * thumb_scale))) / thumb_scale
+        if ch < sh - 1:
+            y0 = crop_offset(energy.sum(axis=1), max(1, round(ch * thumb_scale))) / thumb_scale
+        x0, y0 = min(x0, sw - cw), min(y0, sh - ch)
+    return img.resize(size, Image.LANCZOS, box=(x0, y0, x0 + cw, y0 + ch))
+
+def compose_wallpaper_set(sizes=PHONE_SIZES, seed=None, engine="pil", per_size_fx=True, rng=None):
+    """Render one design for every size in `sizes` at roughly one render's cost.
+
+    The layer stack is rendered once at a master size large enough to
+    cover every target without upscaling, then each target is resampled
+    and smart-cropped from it. With per_size_fx the grain, vignette and
+    contrast run per output so grain stays one pixel fine; otherwise they
+    run once on the master. Returns {size: image}.
+    """
+    rng = rng or RenderRng(seed)
+    master = (max(w for w, _ in sizes), max(h for _, h in sizes))
+    comp, fx = render_layers(master, engine=engine, rng=rng)
+    base = to_image(comp) if engine == "numpy" else comp.convert("RGB")
+    del comp
+    if not per_size_fx:
+        base = post_process(base, fx, engine, rng)
+    out = {}
+    for size in sizes:
+        img = fit_to_size(base, size)
+        out[size] = post_process(img, fx, engine, rng) if per_size_fx else img
     return out
 
+# ---------------------------
+# Tiled rendering
+# ---------------------------
+# Poster sizes don't fit in memory as a stack of full-frame layers, so the
+# frame is rendered in horizontal strips. Every stage takes a `band` and
+# draws only those rows of the full-size design, and each strip carries
+# TILE_MARGIN extra rows on both sides so the blurs see their
+# neighbourhood; the margins are cut off before output. The only
+# frame-wide quantity, the mean luma for the contrast pop, needs a second
+# pass. Pass one spools the strips to a memory-mapped temp file.
+
+TILE_MARGIN = 32
+
+class PNGStreamWriter:
+    """Write an 8-bit RGB PNG from successive row blocks."""
+
+    def __init__(self, path, size, compress_level=6):
+        self.width, self.height = size
+        self.rows = 0
+        self._zip = zlib.compressobj(compress_level)
+        self._f = open(path, "wb")
+        self._f.write(b"\x89PNG\r\n\x1a\n")
+        self._chunk(b"IHDR", struct.pack(">IIBBBBB", self.width, self.height, 8, 2, 0, 0, 0))
+
+    def _chunk(self, tag, data):
+        self._f.write(struct.pack(">I", len(data)) + tag + data)
+        self._f.write(struct.pack(">I", zlib.crc32(tag + data) & 0xffffffff))
+
+    def _filtered(self, rows):
+        n = rows.shape[0]
+        flat = rows.reshape(n, self.width * 3)
+        # "Sub" filter: each byte minus the same channel one pixel left
+        out = np.empty((n, self.width * 3 + 1), dtype=np.uint8)
+        out[:, 0] = 1
+        out[:, 1:4] = flat[:, :3]
+        np.subtract(flat[:, 3:], flat[:, :-3], out=out[:, 4:])
+        return out.tobytes()
+
+    def write_rows(self, rows):
+        """Append an (n, width, 3) uint8 block of rows."""
+        data = self._zip.compress(self._filtered(rows))
+        if data:
+            self._chunk(b"IDAT", data)
+        self.rows += rows.shape[0]
+
+    def close(self):
+        if self.rows != self.height:
+            raise ValueError(f"wrote {self.rows} of {self.height} rows")
+        self._chunk(b"IDAT", self._zip.flush())
+        self._chunk(b"IEND", b"")
+        self._f.close()
+
+class APNGStreamWriter(PNGStreamWriter):
+    """Write a looping animated PNG one full frame at a time.
+
+    The frame count goes in the header, so it is fixed up front; each
+    frame is compressed and written as it arrives, so nothing but the
+    current frame is held.
+    """
+
+    def __init__(self, path, size, frames, fps=30, compress_level=6):
+        super().__init__(path, size, compress_level)
+        self.frames = frames
+        self.fps = fps
+        self.level = compress_level
+        self.written = 0
+        self._seq = 0
+        self._chunk(b"acTL", struct.pack(">II", frames, 0))
+
+    def write_frame(self, frame):
+        """Append one (height, width, 3) uint8 frame."""
+        self._chunk(b"fcTL", struct.pack(">IIIIIHHBB", self._seq, self.width, self.height,
+                                         0, 0, 1, self.fps, 0, 0))
+        self._seq += 1
+        data = zlib.compress(self._filtered(frame), self.level)
+        if self.written == 0:
+            self._chunk(b"IDAT", data)  # the first frame is also the still image
+        else:
+            self._chunk(b"fdAT", struct.pack(">I", self._seq) + data)
+            self._seq += 1
+        self.written += 1
+
+    def close(self):
+        if self.written != self.frames:
+            raise ValueError(f"wrote {self.written} of {self.frames} frames")
+        self._chunk(b"IEND", b"")
+        self._f.close()
+
+def render_strips(size, seed, strip=512):
+    """Yield (y0, RGB image) strips of the wallpaper for `seed`, before the
+    contrast/colour pop, plus the post-FX dict as the final item.
+
+    Each strip replays the design from a fresh RenderRng(seed), rendering
+    only its rows plus TILE_MARGIN on either side.
+    """
+    w, h = size
+    fx = None
+    for y0 in range(0, h, strip):
+        y1 = min(h, y0 + strip)
+        top, bottom = max(0, y0 - TILE_MARGIN), min(h, y1 + TILE_MARGIN)
+        rng = RenderRng(seed)
+        comp, fx = render_layers(size, band=(top, bottom), rng=rng)
+        img = comp.convert("RGB")
+        del comp
+        img = apply_grain_vignette(img, fx, size=size, y0=top, rng=rng)
+        yield y0, img.crop((0, y0 - top, w, y1 - top))
+    yield None, fx
+
+def render_tiled(size, seed, path, strip=512, compress_level=6):
+    """Render a wallpaper of any size to `path` as PNG with memory bounded
+    by the strip height rather than the frame.
+
+    Output matches compose_wallpaper(size, seed) for the PIL engine to
+    within a few levels (the vignette is resampled per strip).
+    """
+    if np is None:
+        raise RuntimeError("tiled rendering requires numpy")
+    w, h = size
+    spool_dir = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=spool_dir) as spool:
+        rows = np.memmap(spool, dtype=np.uint8, mode="w+", shape=(h, w, 3))
+        luma_total = 0
+        for y0, img in render_strips(size, seed, strip):
+            if y0 is None:
+                fx = img
+                break
+            hist = img.convert("L").histogram()
+            luma_total += sum(i * n for i, n in enumerate(hist))
+            rows[y0:y0 + img.height] = np.asarray(img)
+            rows.flush()
+        mean = int(luma_total / (w * h) + 0.5)
+
+        writer = PNGStreamWriter(path, size, compress_level)
+        for y0 in range(0, h, strip):
+            band = Image.fromarray(np.asarray(rows[y0:y0 + strip]), "RGB")
+            writer.write_rows(np.asarray(apply_contrast_color(band, fx, mean)))
+        writer.close()
+        del rows
+    print(f"Saved: {path}")
+    return path
+
+# ---------------------------
+# Background writer
+# ---------------------------
+
+class AsyncWriter:
+    """Encode and write images on background threads.
+
+    submit() returns as soon as the image is queued, so the encode of one
+    wallpaper overlaps the render of the next (Pillow's encoders release
+    the GIL). The queue holds at most `backlog` images, which bounds the
+    memory held by frames waiting to be written. close() waits for every
+    write and re-raises the first error; it returns the paths in
+    submission order.
+    """
+    def __init__(self, threads=1, backlog=2):
+        self.jobs = queue.Queue(maxsize=backlog)
+        self.paths = []
+        self.error = None
+        self.lock = threading.Lock()
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(threads)]
+        for t in self.threads:
+            t.start()
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                return
+            i, img, args = job
+            try:
+                path = save_image(img, *args)
+                with self.lock:
+                    self.paths[i] = path
+            except Exception as e:
+                with self.lock:
+                    self.error = self.error or e
+
+    def submit(self, img, outdir, name=None, profile="png-fast"):
+        if self.error:
+            raise self.error
+        self.paths.append(None)
+        self.jobs.put((len(self.paths) - 1, img, (outdir, name, profile)))
+
+    def close(self):
+        for _ in self.threads:
+            self.jobs.put(None)
+        for t in self.threads:
+            t.join()
+        if self.error:
+            raise self.error
+        return self.paths
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        if exc[0] is None:
+            self.close()
+        else:
+            # Flush what was queued but do not mask the original error
+            try:
+                self.close()
+            except Exception:
+                pass
+
+# ---------------------------
+# Batch rendering
+# ---------------------------
+
+def set_render_options(blur_quality=None, sdf=None):
+    """Set BLUR_QUALITY and SDF_PATTERNS for this process (None keeps one).
+
+    render_batch runs it as the pool initializer, so worker processes
+    started by spawn, which re-import this module, render the same way.
+    """
+    global BLUR_QUALITY, SDF_PATTERNS
+    if blur_quality is not None:
+        blur_factor(0, blur_quality)  # validates it
+        BLUR_QUALITY = blur_quality
+    if sdf is not None:
+        SDF_PATTERNS = sdf
+
+def render_seed(seed, size, outdir, engine="pil", profile="png-fast"):
+    """Render and save one wallpaper; returns the file path only."""
+    img = compose_wallpaper(size=size, seed=seed, engine=engine)
+    return save_image(img, outdir, name=f"wallpaper_{seed}", profile=profile)
+
+def render_batch(seeds, size, outdir, workers=None, engine="pil", profile="png-fast", threads=False):
+    """Render one wallpaper per seed across a process pool (or, with
+    threads=True, a thread pool in this process).
+
+    Every image is fully determined by its seed (each render draws from
+    its own RenderRng), so the output does not depend on the worker count,
+    the pool kind or on which worker picks up which seed. Workers encode
+    and write their own files and send back only the paths. With
+    workers=1 the render loop runs here and an AsyncWriter encodes behind
+    it.
+    """
+    seeds = list(seeds)
+    if workers == 1:
+        with AsyncWriter() as writer:
+            for s in seeds:
+                img = compose_wallpaper(size=size, seed=s, engine=engine)
+                writer.submit(img, outdir, name=f"wallpaper_{s}", profile=profile)
+        return writer.paths
+    workers = workers or os.cpu_count() or 1
+    chunksize = max(1, len(seeds) // (workers * 4))
+    if threads:
+        pool = ThreadPoolExecutor(max_workers=workers)
+    else:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=set_render_options,
+                                   initargs=(BLUR_QUALITY, SDF_PATTERNS))
+    with pool:
+        n = len(seeds)
+        return list(pool.map(render_seed, seeds, [size] * n, [outdir] * n,
+                             [engine] * n, [profile] * n, chunksize=chunksize))
+
+# ---------------------------
+# Animation
+# ---------------------------
+# A live wallpaper is one design looped over t in [0, 1). Only some
+# patterns move; everything under the first moving layer is composited
+# once, static layers above it are kept as rendered and only re-blended,
+# and the moving ones are redrawn per frame from their scene params, so
+# they keep their shapes and colours.
+
+ANIMATED_PATTERNS = ("waves", "concentric", "soft_blobs")
+
+class AnimatedWallpaper:
+    """The looping animation of the design compose_wallpaper(size, seed)
+    draws; frame(0) is that still image.
+
+    Each frame redraws the layers named in `animate` at loop phase t,
+    blends the layers from the first of them upwards onto the cached
+    canvas below it, and runs the post FX with the grain of the still.
+    """
+    def __init__(self, size=None, seed=None, engine="pil", animate=ANIMATED_PATTERNS):
+        unknown = [name for name in animate if name not in ANIMATED_PATTERNS]
+        if unknown:
+            raise ValueError(f"cannot animate {', '.join(unknown)}; "
+                             f"choose from {', '.join(ANIMATED_PATTERNS)}")
+        rng = RenderRng(seed)
+        record = []
+        with stage("animation/setup", seed=seed, engine=engine):
+            comp, self.fx = render_layers(size, engine=engine, rng=rng, record=record)
+        self.engine = engine
+        self.size = comp.size if engine != "numpy" else (comp.shape[1], comp.shape[0])
+        self.post_rng = rng.fork()
+        moving = [i for i, layer in enumerate(record) if layer["name"] in animate]
+        first = moving[0] if moving else len(record)
+        self.base = record[first]["below"] if moving else comp
+        self.layers = record[first:]
+        for layer in self.layers:
+            del layer["below"]
+            layer["animated"] = layer["name"] in animate
+            if layer["animated"]:
+                del layer["layer"]  # redrawn every frame
+
+    def frame(self, t):
+        """The RGB frame at loop phase t in [0, 1)."""
+        with stage("animation/frame", t=t):
+            comp = self.base.copy() if self.engine == "numpy" else self.base
+            for layer in self.layers:
+                image = layer.get("layer")
+                if image is None:
+                    image = traced("pattern/" + layer["name"], layer["draw"], self.size,
+                                   layer["params"], loop_t=t)
+                comp = apply_layer(comp, image, layer["mode"], layer["opacity"], layer["blur"],
+                                   self.engine, layer["name"])
+            if self.engine == "numpy":
+                return np_post_fx(comp, self.fx, self.post_rng.fork())
+            return apply_post_fx(comp.convert("RGB"), self.fx, self.post_rng.fork())
+
+    def frames(self, n):
+        """Yield the n frames of one loop, one at a time."""
+        for i in range(n):
+            yield self.frame(i / n)
+
+def write_animation(frames, n, path, size, fmt="apng", fps=30, compress_level=1):
+    """Stream `n` frames from the `frames` iterator to the encoder.
+
+    fmt="apng" writes one looping animated PNG, "frames" a directory of
+    frame_0000.png... (for ffmpeg or img2webp), "raw" packed RGB24 frames
+    to `path` or, for "-", stdout (ffmpeg -f rawvideo -pix_fmt rgb24
+    -s WxH -r FPS -i -). Only the frame being written is held.
+    """
+    if fmt == "apng":
+        writer = APNGStreamWriter(path, size, n, fps, compress_level)
+        for img in frames:
+            with stage("encode", profile="apng"):
+                writer.write_frame(np.asarray(img))
+        writer.close()
+    elif fmt == "frames":
+        with AsyncWriter(threads=2) as writer:
+            for i, img in enumerate(frames):
+                writer.submit(img, path, name=f"frame_{i:04d}", profile="png-fast")
+    elif fmt == "raw":
+        out = sys.stdout.buffer if path == "-" else open(path, "wb")
+        try:
+            for img in frames:
+                out.write(img.tobytes())
+                out.flush()
+        finally:
+            if out is not sys.stdout.buffer:
+                out.close()
+    else:
+        raise ValueError(f"unknown animation format {fmt!r}")
+    return path
+
 # ---------------------------
 # Main
 # ---------------------------
 
+def blur_quality(text):
+    """argparse type for --blur-quality: a positive number, inf for exact."""
+    value = float(text)
+    if not value > 0:
+        raise argparse.ArgumentTypeError(f"must be positive (inf for exact), got {text}")
+    return value
+
+def animated_layers(text):
+    """argparse type for --animate-layers: comma separated ANIMATED_PATTERNS."""
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in names if name not in ANIMATED_PATTERNS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"cannot animate {', '.join(unknown)}; "
+                                         f"choose from {', '.join(ANIMATED_PATTERNS)}")
+    return names
+
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--w", type=int, default=None, help="Width (pixels)")
     parser.add_argument("--h", type=int, default=None, help="Height (pixels)")
     parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
     parser.add_argument("--outdir", type=str, default="output_wallpapers", help="Output directory")
+    parser.add_argument("--count", type=int, default=1, help="Number of wallpapers (seeds seed, seed+1, ...)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --count (default: all cores)")
+    parser.add_argument("--threads", action="store_true", help="With --count, use worker threads instead of processes")
+    parser.add_argument("--engine", choices=["pil", "numpy"], default="pil", help="Compositing backend")
+    parser.add_argument("--format", choices=list(ENCODE_PROFILES), default="png-fast",
+                        help="Encode profile (--tiled always writes PNG)")
+    parser.add_argument("--export-set", action="store_true", help="Render once, write every phone size (or --sizes)")
+    parser.add_argument("--sizes", type=str, default=None, help="Sizes for --export-set, e.g. 1170x2532,1440x3200")
+    parser.add_argument("--shared-fx", action="store_true", help="With --export-set, run post FX once on the master")
+    parser.add_argument("--tiled", action="store_true", help="Render in horizontal strips with bounded memory")
+    parser.add_argument("--strip", type=int, default=512, help="Strip height for --tiled")
+    parser.add_argument("--trace", type=str, default=None, help="Write per-stage timings to this file")
+    parser.add_argument("--trace-format", choices=["json", "chrome"], default="json",
+                        help="Trace as plain JSON or as a Chrome trace (chrome://tracing, Perfetto)")
+    parser.add_argument("--blur-quality", type=blur_quality, default=BLUR_QUALITY,
+                        help="Smallest sigma a reduced-size blur keeps (higher is closer to exact, inf for exact)")
+    parser.add_argument("--sdf", action="store_true",
+                        help="Anti-aliased distance-field stripes, rings and waves (slower)")
+    parser.add_argument("--preview", action="store_true",
+                        help="Write a thumbnail and the scene JSON per seed instead of full renders")
+    parser.add_argument("--preview-size", type=int, default=256, help="Longest side of --preview thumbnails")
+    parser.add_argument("--scene", type=str, default=None, help="Render a saved scene JSON (at --w/--h or its own size)")
+    parser.add_argument("--save-scene", action="store_true", help="Also write the scene JSON of a single render")
+    parser.add_argument("--animate", type=int, default=None, help="Export a looping live wallpaper of this many frames")
+    parser.add_argument("--fps", type=int, default=30, help="Frame rate for --animate")
+    parser.add_argument("--anim-format", choices=["apng", "frames", "raw"], default="apng",
+                        help="Animated PNG, a PNG per frame, or raw RGB24 for ffmpeg (--outdir - for stdout)")
+    parser.add_argument("--animate-layers", type=animated_layers, default=list(ANIMATED_PATTERNS),
+                        help="Patterns that move, comma separated")
     args = parser.parse_args()
 
+    if args.trace is None:
+        return run(args)
+    if args.count > 1 and args.workers != 1:
+        args.workers = 1  # stages are only recorded in this process
+    with render_trace() as trace:
+        run(args)
+    trace.dump(args.trace, args.trace_format)
+
+def run(args):
+    set_render_options(args.blur_quality, args.sdf)
     size = None
     if args.w and args.h:
         size = (args.w, args.h)
 
-    img = compose_wallpaper(size=size, seed=args.seed)
-    save_image(img, args.outdir)
+    if args.scene:
+        scene = load_scene(args.scene)
+        img = render_scene(scene, size, engine=args.engine)
+        save_image(img, args.outdir, name=f"wallpaper_{scene['seed']}_{img.width}x{img.height}", profile=args.format)
+        return
+
+    if args.preview:
+        base = args.seed if args.seed is not None else random.randrange(2**31)
+        os.makedirs(args.outdir, exist_ok=True)
+        with AsyncWriter(threads=2) as writer:
+            for seed in range(base, base + args.count):
+                scene = sample_scene(size, seed)
+                save_scene(scene, os.path.join(args.outdir, f"wallpaper_{seed}.json"))
+                img = render_preview(scene, args.preview_size, engine=args.engine)
+                writer.submit(img, args.outdir, name=f"wallpaper_{seed}_preview", profile=args.format)
+        print(f"{args.count} previews and scenes saved to '{args.outdir}'; render one with --scene")
+        return
+
+    if args.export_set:
+        sizes = PHONE_SIZES
+        if args.sizes:
+            sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+        seed = args.seed if args.seed is not None else random.randrange(2**31)
+        images = compose_wallpaper_set(sizes, seed=seed, engine=args.engine,
+                                       per_size_fx=not args.shared_fx)
+        with AsyncWriter(threads=min(4, len(images))) as writer:
+            for (w, h), img in images.items():
+                writer.submit(img, args.outdir, name=f"wallpaper_{seed}_{w}x{h}", profile=args.format)
+        return
+
+    if args.animate:
+        seed = args.seed if args.seed is not None else random.randrange(2**31)
+        anim = AnimatedWallpaper(size, seed, engine=args.engine, animate=args.animate_layers)
+        path = args.outdir
+        if args.outdir != "-":
+            os.makedirs(args.outdir, exist_ok=True)
+            ext = {"apng": ".png", "frames": "", "raw": ".rgb"}[args.anim_format]
+            path = os.path.join(args.outdir, f"wallpaper_{seed}_anim{ext}")
+        write_animation(anim.frames(args.animate), args.animate, path, anim.size,
+                        fmt=args.anim_format, fps=args.fps)
+        if args.outdir != "-":
+            print(f"{args.animate} frames of {anim.size[0]}x{anim.size[1]} at {args.fps} fps saved to {path}")
+        return
+
+    if args.tiled:
+        size = size or random_phone_size()
+        seed = args.seed if args.seed is not None else random.randrange(2**31)
+        os.makedirs(args.outdir, exist_ok=True)
+        render_tiled(size, seed, os.path.join(args.outdir, f"wallpaper_{seed}.png"), strip=args.strip)
+        return
+
+    if args.count > 1:
+        base = args.seed if args.seed is not None else random.randrange(2**31)
+        paths = render_batch(range(base, base + args.count), size, args.outdir,
+                             workers=args.workers, engine=args.engine, profile=args.format,
+                             threads=args.threads)
+        print(f"{len(paths)} wallpapers saved to '{args.outdir}' (seeds {base}..{base + args.count - 1})")
+        return
+
+    seed = args.seed if args.seed is not None else random.randrange(2**31)
+    if not args.save_scene:
+        img = compose_wallpaper(size=size, seed=seed, engine=args.engine)
+        save_image(img, args.outdir, name=f"wallpaper_{seed}", profile=args.format)
+        return
+    scene = sample_scene(size, seed)
+    save_image(render_scene(scene, engine=args.engine), args.outdir, name=f"wallpaper_{seed}", profile=args.format)
+    save_scene(scene, os.path.join(args.outdir, f"wallpaper_{seed}.json"))
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Wallpaper Generator — Benchmarks
+
+Usage:
+  python benchmark.py [--repeat 3] [--filter pattern/] [--sizes 1170x2532]
+  python benchmark.py --json results.json
+  python benchmark.py --baseline results.json [--threshold 0.10]
+  python benchmark.py --blur-error [--sizes 1440x3200]
+
+Times every background, pattern, blend mode and post-FX stage of
+Wallpaper.py plus compose_wallpaper end to end (both engines) at each
+phone size, and the throughput of the sprite and terrain generators in
+the repository root. Every measurement reseeds both RNGs with a fixed
+seed, so runs are comparable.
+
+Each case runs in a fresh process: the best of `--repeat` wall times is
+reported along with how far the process RSS peaked above its size when
+the runs started (this counts Pillow's image buffers, which tracemalloc
+cannot see, and anything the field cache keeps). With --baseline, cases
+slower than the saved run by more than --threshold are listed and the
+exit status is 1. --blur-error prints how far the pyramid blurs stray
+from exact blurs of the same layer instead of timing anything.
+"""
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+import PIL
+
+import Wallpaper as W
+
+# The sprite and terrain generators are loaded through assetgen, which
+# lives in the repository root
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import assetgen
+
+SEED = 1234
+BLUR_RADII = [2, 16, 64, 128]
+BLEND_MODES = ["normal", "multiply", "screen", "overlay", "softlight", "add", "subtract"]
+FX = {"grain": (0.06, 60), "vignette": 0.15, "contrast": 1.08, "color": 1.1}
+
+def time_call(fn, *args, seed=SEED, repeat=3):
+    """Best wall time of `repeat` calls, reseeding both RNGs before each."""
+    best = float("inf")
+    for _ in range(repeat):
+        random.seed(seed)
+        np.random.seed(seed)
+        t0 = time.perf_counter()
+        fn(*args)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+# ---------------------------
+# Cases
+# ---------------------------
+# Each setup takes a frame size (None for the sprite generators) and
+# returns (fn, args, items): the timed call and how many outputs one
+# call produces, for the throughput column.
+
+def _scene(size):
+    random.seed(SEED)
+    np.random.seed(SEED)
+    palette = W.choose_palette()
+    bg = W.bg_linear_gradient(size, palette[0], palette[-1], angle_deg=30).convert("RGBA")
+    layer = W.pattern_scatter_circles(size, palette)
+    return palette, bg, layer
+
+def _pattern(fn):
+    def setup(size):
+        return fn, (size, _scene(size)[0]), 1
+    return setup
+
+def _sdf_pattern(fn):
+    def setup(size):
+        W.SDF_PATTERNS = True  # each case runs in its own process
+        return fn, (size, _scene(size)[0]), 1
+    return setup
+
+def _blend(mode, engine):
+    def setup(size):
+        _, bg, layer = _scene(size)
+        if engine == "numpy":
+            return W.np_blend_layer, (W.to_float(bg), W.to_float(layer), mode, 0.6), 1
+        return W.blend_layer, (bg, layer, mode, 0.6), 1
+    return setup
+
+def _post(fn, *extra):
+    def setup(size):
+        return fn, (_scene(size)[1].convert("RGB"),) + extra, 1
+    return setup
+
+def _compose(engine):
+    def setup(size):
+        return W.compose_wallpaper, (size, SEED, engine), 1
+    return setup
+
+def _blur(radius, exact, engine):
+    quality = float("inf") if exact else None
+    def setup(size):
+        layer = _scene(size)[2]
+        if engine == "numpy":
+            return lambda: W.gaussian_blur(W.to_float(layer), radius, quality), (), 1
+        return W.gaussian_blur, (layer, radius, quality), 1
+    return setup
+
+def _batch(call, n):
+    def run():
+        for _ in range(n):
+            call()
+    return run
+
+def _cars(size):
+    cars = assetgen.script("cars")
+    out = tempfile.mkdtemp()
+    def run():
+        for i in range(50):
+            cars.generate_car_image("right", os.path.join(out, f"car_right_{i}.png"))
+            cars.generate_car_image("left", os.path.join(out, f"car_left_{i}.png"))
+    return run, (), 100
+
+def _characters(size):
+    sprites = assetgen.script("characters")
+    return _batch(sprites.make_detailed_sprite, 200), (), 200
+
+def _sheets(size):
+    sprites = assetgen.script("characters")
+    return _batch(sprites.generate_sheet, 20), (), 20
+
+def _desert(size):
+    desert = assetgen.script("desert")
+    return _batch(lambda: desert.generate_desert_ground("desert_ground.png"), 20), (), 20
+
+def _grass(size):
+    grass = assetgen.script("grass")
+    return _batch(lambda: grass.generate_grass_texture("grass_texture.png"), 20), (), 20
+
+WALLPAPER_CASES = {
+    "background/linear": lambda size: (W.bg_linear_gradient, (size, (20, 40, 90), (240, 180, 120), 30), 1),
+    "background/radial": lambda size: (W.bg_radial_gradient, (size, (20, 40, 90), (240, 180, 120)), 1),
+    "pattern/scatter_circles": _pattern(W.pattern_scatter_circles),
+    "pattern/stripes": _pattern(W.pattern_stripes),
+    "pattern/concentric": _pattern(W.pattern_concentric),
+    "pattern/triangles": _pattern(W.pattern_triangles),
+    "pattern/waves": _pattern(W.pattern_waves),
+    "pattern/soft_blobs": _pattern(W.pattern_soft_blobs),
+    "pattern/stripes_sdf": _sdf_pattern(W.pattern_stripes),
+    "pattern/concentric_sdf": _sdf_pattern(W.pattern_concentric),
+    "pattern/waves_sdf": _sdf_pattern(W.pattern_waves),
+    "pattern/dots": _pattern(W.pattern_dots),
+    "pattern/dots_draw": _pattern(W._pattern_dots_draw),
+    **{f"blur/{kind}_r{r}": _blur(r, kind == "exact", "pil") for r in BLUR_RADII for kind in ("exact", "pyramid")},
+    **{f"blur_numpy/{kind}_r{r}": _blur(r, kind == "exact", "numpy") for r in BLUR_RADII[:2] for kind in ("exact", "pyramid")},
+    **{f"blend/{mode}": _blend(mode, "pil") for mode in BLEND_MODES},
+    **{f"blend_numpy/{mode}": _blend(mode, "numpy") for mode in BLEND_MODES},
+    "post/paper_texture": _post(W.add_paper_texture, 0.08),
+    "post/grain": _post(W.add_grain, *FX["grain"]),
+    "post/vignette": _post(W.subtle_vignette, FX["vignette"]),
+    "post/contrast_color": _post(W.apply_contrast_color, FX),
+    "post/all": _post(W.post_process, FX, "pil"),
+    "post_numpy/all": _post(W.post_process, FX, "numpy"),
+    "compose/pil": _compose("pil"),
+    "compose/numpy": _compose("numpy"),
+}
+
+SPRITE_CASES = {
+    "sprites/generate_car_image": _cars,
+    "sprites/make_detailed_sprite": _characters,
+    "sprites/generate_sheet": _sheets,
+    "terrain/generate_desert_ground": _desert,
+    "terrain/generate_grass_texture": _grass,
+}
+
+# ---------------------------
+# Runner
+# ---------------------------
+
+def _maxrss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def _rss_mb():
+    """Current RSS, after resetting the high-water mark where Linux allows
+    it so setup allocations do not count towards the peak. Elsewhere this
+    is the high-water mark itself."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return _maxrss_mb()
+
+def run_case(job):
+    """Measure one (name, size, repeat) in the current (fresh) process."""
+    name, size, repeat = job
+    setup = WALLPAPER_CASES.get(name) or SPRITE_CASES[name]
+    with tempfile.TemporaryDirectory() as scratch, contextlib.redirect_stdout(io.StringIO()):
+        os.chdir(scratch)
+        fn, args, items = setup(size)
+        rss0 = _rss_mb()
+        best = time_call(fn, *args, repeat=repeat)
+        peak = _maxrss_mb() - rss0
+    return {
+        "case": name,
+        "size": f"{size[0]}x{size[1]}" if size else None,
+        "ms": round(best * 1e3, 3),
+        "per_s": round(items / best, 2),
+        "peak_mb": round(max(0.0, peak), 1),
+    }
+
+def plan(sizes, pattern=None, repeat=3):
+    jobs = [(name, size, repeat) for name in WALLPAPER_CASES for size in sizes]
+    jobs += [(name, None, repeat) for name in SPRITE_CASES]
+    return [job for job in jobs if not pattern or pattern in job[0]]
+
+def run_all(jobs):
+    """Run every job in its own child process and print a row as each ends."""
+    print(f"{'case':<32} {'size':>10} {'ms':>9} {'per s':>9} {'peak MB':>8}")
+    results = []
+    with multiprocessing.Pool(1, maxtasksperchild=1) as pool:
+        for r in pool.imap(run_case, jobs):
+            print(f"{r['case']:<32} {r['size'] or '-':>10} {r['ms']:9.1f} {r['per_s']:9.1f} {r['peak_mb']:8.1f}",
+                  flush=True)
+            results.append(r)
+    return results
+
+def compare(results, baseline, threshold=0.10):
+    """Print the cases slower than `baseline` by more than `threshold`."""
+    before = {(r["case"], r["size"]): r for r in baseline["results"]}
+    slower = []
+    for r in results:
+        old = before.get((r["case"], r["size"]))
+        if old and r["ms"] > old["ms"] * (1 + threshold):
+            slower.append((r, old))
+    if not slower:
+        print(f"\nNo regressions over {threshold:.0%} against the baseline.")
+        return []
+    print(f"\n{len(slower)} regressions over {threshold:.0%}:")
+    for r, old in slower:
+        print(f"  {r['case']:<32} {r['size'] or '-':>10} {old['ms']:9.1f} -> {r['ms']:9.1f} ms"
+              f"  ({r['ms'] / old['ms']:.2f}x)")
+    return slower
+
+def blur_error(sizes):
+    """Print the max and mean channel error (0-255) of the pyramid blur
+    of the scene layer against the exact blur, per radius and engine.
+    The numpy columns blur the layer at quarter size (radius / 4), since
+    the exact numpy blur takes seconds at large radii."""
+    print(f"{'radius':>6} {'size':>10} {'factor':>6} {'pil max':>8} {'pil mean':>9}"
+          f" {'np factor':>9} {'np max':>7} {'np mean':>8}")
+    for size in sizes:
+        layer = _scene(size)[2]
+        for r in BLUR_RADII:
+            pil = np.abs(np.asarray(W.gaussian_blur(layer, r), np.int16)
+                         - np.asarray(W.gaussian_blur(layer, r, float("inf")), np.int16))
+            small = layer.resize((size[0] // 4, size[1] // 4))
+            canvas = W.to_float(small)
+            npy = np.abs(W.gaussian_blur(canvas.copy(), r / 4) - W.gaussian_blur(canvas, r / 4, float("inf"))) * 255
+            print(f"{r:6} {size[0]}x{size[1]:<5} {W.blur_factor(r):6} {pil.max():8} {pil.mean():9.3f}"
+                  f" {W.blur_factor(r / 4):9} {npy.max():7.2f} {npy.mean():8.3f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+    parser.add_argument("--filter", type=str, default=None, help="Only cases whose name contains this")
+    parser.add_argument("--sizes", type=str, default=None, help="Frame sizes, e.g. 1170x2532 (default: all phone sizes)")
+    parser.add_argument("--json", type=str, default=None, help="Write the results to this file")
+    parser.add_argument("--baseline", type=str, default=None, help="Compare against a saved --json file")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Slow-down that counts as a regression")
+    parser.add_argument("--blur-error", action="store_true", help="Report pyramid blur error against exact blur")
+    args = parser.parse_args()
+
+    sizes = W.PHONE_SIZES
+    if args.sizes:
+        sizes = [tuple(int(v) for v in s.split("x")) for s in args.sizes.split(",")]
+    if args.blur_error:
+        return blur_error(sizes)
+    results = run_all(plan(sizes, args.filter, args.repeat))
+
+    report = {
+        "meta": {
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "pillow": PIL.__version__,
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "repeat": args.repeat,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Saved: {args.json}")
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
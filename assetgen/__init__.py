@@ -0,0 +1,167 @@
+"""
+Asset generators as importable functions
+
+The generator scripts sit at the top of the repository, several with
+spaces in their names, so they are loaded here by path, once, and each
+asset kind is exposed as a function of its parameters that returns a
+PIL image and writes nothing:
+
+    import assetgen
+    img = assetgen.generate("car", seed=7, direction="left")
+    data = assetgen.encode(img)
+
+Every kind is a pure function of its seed and parameters. Scripts,
+templates, sprite memos and terrain chunk caches stay loaded for the
+life of the process; assetgen.daemon keeps one such process serving
+requests over JSON lines.
+"""
+import functools
+import hashlib
+import importlib.util
+import inspect
+import io
+import os
+import random
+
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCRIPTS = {
+    "cars": "Car Generator.py",
+    "car_v2": "car generator v2.0.py",
+    "muscle_car": "static car maker.py",
+    "characters": "procerural_character_sprite.py",
+    "desert": "Desert.py",
+    "grass": "Grassy land.py",
+    "terrain": "terrain_stream.py",
+    "wallpaper": os.path.join("WGenerator", "Wallpaper.py"),
+}
+
+@functools.lru_cache(maxsize=None)
+def script(name):
+    """The generator script SCRIPTS[name], imported once by path."""
+    path = os.path.join(ROOT, SCRIPTS[name])
+    spec = importlib.util.spec_from_file_location(f"assetgen_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def _size(size):
+    return (size, size) if isinstance(size, int) else tuple(size)
+
+def car(seed=None, direction="right", **spec):
+    """One top-down car; `spec` fields (type, color, spoiler, shaker,
+    exhaust, paint) override the random design."""
+    cars = script("cars")
+    design = cars.random_car_spec(random.Random(seed))
+    unknown = set(spec) - set(design)
+    if unknown:
+        raise ValueError(f"unknown car fields {sorted(unknown)}")
+    design.update((k, tuple(v) if k == "color" else v) for k, v in spec.items())
+    return cars.render_car(design, direction)
+
+def car_v2():
+    return script("car_v2").generate_car_sprite()
+
+def muscle_car():
+    return script("muscle_car").generate_muscle_car()
+
+def character(seed=None, size=16, scale=4):
+    """A character's 3x4 walk-cycle sheet (palette image)."""
+    sprites = script("characters")
+    colors, style = sprites.random_character(random.Random(seed))
+    return sprites.recolor(sprites.template_sheet(style, size, scale), colors)
+
+# 100x100 at the stock density is the original ImageDraw texture;
+# anything else goes through the vectorized rasterizer
+
+def _stock(size, density):
+    return _size(size) == (100, 100) and density == 1.0
+
+def _array_image(array, seed, size, density, wrap):
+    from PIL import Image
+    return Image.fromarray(array(_size(size), density, np.random.default_rng(seed), wrap), "RGB")
+
+def desert(seed=None, size=100, density=1.0, wrap=False):
+    module = script("desert")
+    if _stock(size, density):
+        return module.desert_ground_image(random.Random(seed), wrap)
+    return _array_image(module.desert_ground_array, seed, size, density, wrap)
+
+def grass(seed=None, size=100, density=1.0, wrap=False):
+    module = script("grass")
+    if _stock(size, density):
+        return module.grass_texture_image(random.Random(seed), (100, 100), wrap)
+    return _array_image(module.grass_texture_array, seed, size, density, wrap)
+
+@functools.lru_cache(maxsize=8)
+def _terrain(kind, seed, chunk):
+    return script("terrain").Terrain(kind, seed, chunk)
+
+def terrain(kind="desert", seed=0, region=(0, 0, 1280, 720), chunk=100):
+    """The world rect region=(x, y, w, h) of a streamed terrain map; the
+    map's chunk cache stays warm between calls."""
+    return _terrain(kind, seed, chunk).render_region(*region)
+
+def wallpaper(seed=None, size=(1170, 2532), engine="pil"):
+    return script("wallpaper").compose_wallpaper(size=_size(size), seed=seed, engine=engine)
+
+KINDS = {
+    "car": car,
+    "car_v2": car_v2,
+    "muscle_car": muscle_car,
+    "character": character,
+    "desert": desert,
+    "grass": grass,
+    "terrain": terrain,
+    "wallpaper": wallpaper,
+}
+
+# Files each kind's output depends on, hashed into its code version
+SOURCES = {
+    "car": ["Car Generator.py"],
+    "car_v2": ["car generator v2.0.py"],
+    "muscle_car": ["static car maker.py"],
+    "character": ["procerural_character_sprite.py"],
+    "desert": ["Desert.py", "terrain_common.py", "terrain_raster.py"],
+    "grass": ["Grassy land.py", "terrain_common.py", "terrain_raster.py"],
+    "terrain": ["terrain_stream.py", "Desert.py", "Grassy land.py", "terrain_common.py"],
+    "wallpaper": [os.path.join("WGenerator", "Wallpaper.py")],
+}
+
+@functools.lru_cache(maxsize=None)
+def version(kind):
+    """Hash of the code behind `kind` (its sources and this module), so
+    cached output goes stale when the generator changes."""
+    digest = hashlib.sha1()
+    for name in SOURCES[kind] + [os.path.join("assetgen", "__init__.py")]:
+        with open(os.path.join(ROOT, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+def call_args(kind, params):
+    """params with every default filled in, so equal calls spell equal."""
+    bound = inspect.signature(KINDS[kind]).bind(**params)
+    bound.apply_defaults()
+    return bound.arguments
+
+def generate(kind, **params):
+    if kind not in KINDS:
+        raise ValueError(f"unknown asset kind {kind!r}")
+    return KINDS[kind](**params)
+
+def encode(img, profile="png-fast"):
+    """img as bytes, with one of Wallpaper.ENCODE_PROFILES."""
+    fmt, _, options = script("wallpaper").ENCODE_PROFILES[profile]
+    if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    buf = io.BytesIO()
+    img.save(buf, fmt, **options)
+    return buf.getvalue()
+
+def extension(profile="png-fast"):
+    return script("wallpaper").ENCODE_PROFILES[profile][1]
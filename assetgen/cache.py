@@ -0,0 +1,152 @@
+"""
+Content-addressed asset cache
+
+Stores encoded assets on disk under the hash of what produced them:
+kind, code version (assetgen.version), call arguments with defaults
+filled in, and encode profile. A build that asks for the same asset
+again gets the stored file; changing a generator's source, a seed or a
+parameter changes the key, so only what changed is rendered.
+
+Usage:
+  python -m assetgen.cache .assetcache             # entries, bytes
+  python -m assetgen.cache .assetcache --trim 256  # evict down to 256 MiB
+
+Files are written to a temporary name and renamed into place, so
+workers sharing a cache directory never see a partial file; two workers
+missing on the same key both render and the last rename wins. The
+directory is kept under max_bytes by evicting the least recently used
+entries (a hit touches its file's mtime). Each worker counts the bytes
+it writes and rescans the directory when it trims, so with several
+workers the bound can be overshot by what the others wrote meanwhile.
+Within one process the counters and the trim bookkeeping are locked, so
+threads (assetgen.daemon's socket server) can share one cache.
+Calls without a seed for a seeded kind are random and bypass the cache.
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+import assetgen
+
+class AssetCache:
+    """On-disk LRU of encoded assets, root/<key[:2]>/<key>.<ext>."""
+    def __init__(self, root, max_bytes=2**30):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = self.misses = self.bypassed = self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        self.bytes = sum(size for _, _, size in self.entries())
+
+    def key(self, kind, params, profile="png-fast"):
+        args = assetgen.call_args(kind, params)
+        text = json.dumps({"kind": kind, "version": assetgen.version(kind),
+                           "args": args, "profile": profile}, sort_keys=True)
+        return hashlib.sha256(text.encode()).hexdigest()
+
+    def path(self, key, profile="png-fast"):
+        return os.path.join(self.root, key[:2], f"{key}.{assetgen.extension(profile)}")
+
+    def get(self, kind, params=None, profile="png-fast", render=None):
+        """(data, hit): the encoded asset, rendered and stored on a miss.
+        `render` returns the encoded bytes (default: assetgen.generate,
+        then assetgen.encode)."""
+        params = params or {}
+        if kind not in assetgen.KINDS:
+            raise ValueError(f"unknown asset kind {kind!r}")
+        if render is None:
+            render = lambda: assetgen.encode(assetgen.generate(kind, **params), profile)
+        args = assetgen.call_args(kind, params)
+        if "seed" in args and args["seed"] is None:
+            with self._lock:
+                self.bypassed += 1
+            return render(), False
+        path = self.path(self.key(kind, params, profile), profile)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+            with self._lock:
+                self.hits += 1
+            return data, True
+        except FileNotFoundError:
+            pass
+        with self._lock:
+            self.misses += 1
+        data = render()
+        self.put(path, data)
+        return data, False
+
+    def put(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        with self._lock:
+            self.bytes += len(data)
+            if self.bytes > self.max_bytes:
+                self._trim(int(self.max_bytes * 0.9))
+
+    def entries(self):
+        """(mtime, path, size) of every stored file."""
+        found = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue  # evicted by another worker meanwhile
+                found.append((st.st_mtime, entry.path, st.st_size))
+        return found
+
+    def trim(self, max_bytes):
+        """Evict least recently used files until at most max_bytes remain.
+        Rescans the directory, since other workers write to it too."""
+        with self._lock:
+            self._trim(max_bytes)
+
+    def _trim(self, max_bytes):
+        entries = sorted(self.entries())
+        self.bytes = sum(size for _, _, size in entries)
+        for _, path, size in entries:
+            if self.bytes <= max_bytes:
+                break
+            try:
+                os.unlink(path)
+                self.evictions += 1
+            except FileNotFoundError:
+                pass
+            self.bytes -= size
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "bypassed": self.bypassed,
+                    "evictions": self.evictions, "bytes": self.bytes}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("root", type=str, help="Cache directory")
+    parser.add_argument("--trim", type=float, default=None, help="Evict down to this many MiB")
+    args = parser.parse_args()
+
+    cache = AssetCache(args.root)
+    if args.trim is not None:
+        cache.trim(int(args.trim * 2**20))
+    entries = cache.entries()
+    print(json.dumps({"entries": len(entries), "bytes": sum(size for _, _, size in entries),
+                      "evicted": cache.evictions}))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""
+Asset generation daemon
+
+Keeps one warm process (PIL/numpy imported, generator scripts loaded,
+sprite and chunk caches filled) serving assets over JSON lines, so
+callers pay no interpreter start-up per asset.
+
+Usage (from the repository root, or with it on PYTHONPATH):
+  python -m assetgen.daemon                       # requests on stdin, replies on stdout
+  python -m assetgen.daemon --socket /tmp/assetgen.sock
+
+One request per line:
+  {"id": 1, "kind": "car", "params": {"seed": 7, "direction": "left"}}
+  {"id": 2, "kind": "desert", "params": {"size": 512, "wrap": true}, "out": "desert.png"}
+  {"id": 3, "kind": "stats"}
+
+and one reply line per request, in order, carrying the same id:
+  {"id": 1, "ok": true, "size": [50, 30], "data": "<base64 png>"}
+  {"id": 2, "ok": true, "size": [512, 512], "path": "desert.png"}
+  {"id": 9, "ok": false, "error": "ValueError: unknown asset kind 'boat'"}
+
+"profile" picks an encoding from Wallpaper.ENCODE_PROFILES (png-fast by
+default). With "out" the daemon writes the file itself and replies with
+its path instead of the bytes. "kinds" and "stats" are answered without
+generating anything. With --cache DIR every asset goes through an
+AssetCache (assetgen.cache) and replies say whether it was "cached".
+"""
+import argparse
+import base64
+import io
+import json
+import os
+import socketserver
+import sys
+import threading
+import time
+
+from PIL import Image
+
+import assetgen
+from assetgen.cache import AssetCache
+
+# The generators fill shared, unlocked module-level memos (car part
+# masks, character templates, terrain chunk caches), so one generates at
+# a time; encoding and I/O run outside the lock
+_LOCK = threading.Lock()
+# Request threads of the socket server all bump the counters
+_STATS_LOCK = threading.Lock()
+_STATS = {"started": time.time(), "requests": 0, "errors": 0}
+_CACHE = None
+
+def stats():
+    return {
+        "uptime": round(time.time() - _STATS["started"], 3),
+        "requests": _STATS["requests"],
+        "errors": _STATS["errors"],
+        "scripts": assetgen.script.cache_info().currsize,
+        "terrains": assetgen._terrain.cache_info().currsize,
+        "cache": _CACHE.stats() if _CACHE else None,
+    }
+
+def _count(key):
+    with _STATS_LOCK:
+        _STATS[key] += 1
+
+def _render(kind, params, profile):
+    with _LOCK:
+        img = assetgen.generate(kind, **params)
+    return assetgen.encode(img, profile)
+
+def handle(request):
+    """The reply dict for one request dict."""
+    kind = request.get("kind")
+    reply = {"id": request.get("id"), "ok": True}
+    if kind == "kinds":
+        reply["kinds"] = sorted(assetgen.KINDS)
+        return reply
+    if kind == "stats":
+        reply.update(stats())
+        return reply
+    profile = request.get("profile", "png-fast")
+    params = request.get("params", {})
+    if _CACHE is None:
+        data = _render(kind, params, profile)
+    else:
+        data, reply["cached"] = _CACHE.get(kind, params, profile, lambda: _render(kind, params, profile))
+    reply["size"] = list(Image.open(io.BytesIO(data)).size)
+    if "out" in request:
+        path = request["out"]
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        reply["path"] = path
+    else:
+        reply["data"] = base64.b64encode(data).decode("ascii")
+    return reply
+
+def handle_line(line):
+    """The JSON reply line for one JSON request line."""
+    _count("requests")
+    request = {}
+    try:
+        request = json.loads(line)
+        reply = handle(request)
+    except Exception as e:
+        _count("errors")
+        reply = {"id": request.get("id") if isinstance(request, dict) else None,
+                 "ok": False, "error": f"{type(e).__name__}: {e}"}
+    return json.dumps(reply, separators=(",", ":")) + "\n"
+
+def serve_stdio(stdin=sys.stdin, stdout=sys.stdout):
+    for line in stdin:
+        if line.strip():
+            stdout.write(handle_line(line))
+            stdout.flush()
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip():
+                self.wfile.write(handle_line(line).encode())
+                self.wfile.flush()
+
+def serve_socket(path):
+    """Serve every client connecting to the Unix socket at `path`, each on
+    its own thread, until interrupted."""
+    if os.path.exists(path):
+        os.unlink(path)
+    with socketserver.ThreadingUnixStreamServer(path, _Handler) as server:
+        server.daemon_threads = True
+        print(f"assetgen daemon listening on {path}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(path)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", type=str, default=None, help="Serve on this Unix socket instead of stdin/stdout")
+    parser.add_argument("--warm", type=str, default="car,character",
+                        help="Kinds to generate once at start-up (comma separated, empty for none)")
+    parser.add_argument("--cache", type=str, default=None, help="Content-addressed cache directory")
+    parser.add_argument("--cache-size", type=float, default=1024, help="Cache bound in MiB")
+    args = parser.parse_args()
+
+    global _CACHE
+    if args.cache:
+        _CACHE = AssetCache(args.cache, int(args.cache_size * 2**20))
+
+    for kind in filter(None, args.warm.split(",")):
+        assetgen.generate(kind)
+    if args.socket:
+        serve_socket(args.socket)
+    else:
+        serve_stdio()
+
+if __name__ == "__main__":
+    main()
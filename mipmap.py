@@ -0,0 +1,69 @@
+"""
+Mipmap chains
+
+Builds the chain of half-size levels of a texture, down to 1x1, and
+packs it into one file (the classic layout: the base level on the left,
+each smaller level stacked on the right) or into a SpriteAtlas
+(sprite_atlas.py), so an engine can load a small tileable texture with
+its filtered levels instead of one huge unique image.
+
+Levels of a seamless texture are filtered on the torus: each level is
+resampled from a 3x3 tiling of the one above and the centre kept, so
+the filter reads across the edges and the levels tile as well.
+"""
+import json
+import os
+from PIL import Image
+
+FILTERS = {"box": Image.BOX, "lanczos": Image.LANCZOS}
+
+def mipmap_chain(img, filter="box", wrap=True):
+    """[base, half, quarter, ..., 1x1]; each level is the one above
+    resampled to half size (rounded down, at least 1px)."""
+    resample = FILTERS[filter]
+    levels = [img]
+    while max(img.size) > 1:
+        w, h = img.size
+        size = (max(1, w // 2), max(1, h // 2))
+        if wrap:
+            tiled = Image.new(img.mode, (w * 3, h * 3))
+            for ty in range(3):
+                for tx in range(3):
+                    tiled.paste(img, (tx * w, ty * h))
+            img = tiled.resize((size[0] * 3, size[1] * 3), resample)
+            img = img.crop((size[0], size[1], size[0] * 2, size[1] * 2))
+        else:
+            img = img.resize(size, resample)
+        levels.append(img)
+    return levels
+
+def mipmap_sheet(levels):
+    """(image, rects): the levels in one image, base on the left and the
+    rest stacked top to bottom beside it; rects[n] is level n's [x, y, w, h]."""
+    w, h = levels[0].size
+    side = levels[1].size[0] if len(levels) > 1 else 0
+    # The stack outgrows the base on wide textures (64x8 stacks 10px beside an 8px base)
+    stack = sum(level.size[1] for level in levels[1:])
+    sheet = Image.new(levels[0].mode, (w + side, max(h, stack)))
+    rects = [[0, 0, w, h]]
+    sheet.paste(levels[0], (0, 0))
+    y = 0
+    for level in levels[1:]:
+        sheet.paste(level, (w, y))
+        rects.append([w, y, *level.size])
+        y += level.size[1]
+    return sheet, rects
+
+def save_mipmaps(img, path, filter="box", wrap=True, atlas=None, name=None):
+    """Write img's chain to `path` with a `.json` index of level rects
+    beside it, or add each level to `atlas` as <name>_mip<n>."""
+    levels = mipmap_chain(img, filter, wrap)
+    if atlas is not None:
+        for n, level in enumerate(levels):
+            atlas.add(f"{name}_mip{n}", level, frame=n, filter=filter, wrap=wrap)
+        return
+    sheet, rects = mipmap_sheet(levels)
+    sheet.save(path)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump({"file": os.path.basename(path), "filter": filter, "wrap": wrap,
+                   "levels": rects}, f, separators=(",", ":"))
@@ -1,60 +1,82 @@
 from PIL import Image, ImageDraw
+import argparse
+import os
 import random
 
-def make_detailed_sprite(size=16):
-    """Return a detailed humanoid base sprite with clothing, hair, and shoes."""
-    img = Image.new("RGBA", (size, size), (0,0,0,0))
-    d = ImageDraw.Draw(img)
-
-    # Colors
-    skin = random.choice([(255,224,189),(229,194,152),(141,85,36)])
-    hair = random.choice([(0,0,0),(120,60,20),(200,180,50),(255,255,255)])
-    shirt = random.choice([(200,50,50),(50,200,50),(50,50,200),
-                           (200,200,50),(200,100,200)])
-    pants = random.choice([(40,40,120),(80,40,0),(20,100,80)])
-    shoes = random.choice([(60,60,60),(200,200,200),(100,0,0)])
-    eye = (255,255,255)
-    outline = (0,0,0)
-
+try:
+    import numpy as np
+except Exception:
+    np = None
+
+# Characters are drawn once per hair style into palette ("P") templates
+# whose pixels are slot indices; a character is a template plus a palette
+SLOTS = ["transparent", "outline", "eye", "skin", "hair", "shirt", "pants", "shoes"]
+TRANSPARENT, OUTLINE, EYE, SKIN, HAIR, SHIRT, PANTS, SHOES = range(len(SLOTS))
+HAIR_STYLES = ["short","long","mohawk"]
+ROWS = ["down", "left", "right", "up"]
+
+# Colour choices per trait, in the order they are drawn
+TRAIT_COLORS = {
+    "skin": [(255,224,189),(229,194,152),(141,85,36)],
+    "hair": [(0,0,0),(120,60,20),(200,180,50),(255,255,255)],
+    "shirt": [(200,50,50),(50,200,50),(50,50,200),
+              (200,200,50),(200,100,200)],
+    "pants": [(40,40,120),(80,40,0),(20,100,80)],
+    "shoes": [(60,60,60),(200,200,200),(100,0,0)],
+}
+FIXED_COLORS = {"eye": (255,255,255), "outline": (0,0,0)}
+
+def random_character(rng=random):
+    """Pick the colours and hair style of one character."""
+    colors = {name: rng.choice(choices) for name, choices in TRAIT_COLORS.items()}
+    colors.update(FIXED_COLORS)
+    style = rng.choice(HAIR_STYLES)
+    return colors, style
+
+def draw_figure(d, size, c, style):
+    """Draw the humanoid with clothing, hair, and shoes; `c` maps each
+    slot name to its fill (a colour, or a palette index)."""
     # Body (torso with shirt)
-    d.rectangle([4,6,size-5,size-2], fill=shirt, outline=outline)
+    d.rectangle([4,6,size-5,size-2], fill=c["shirt"], outline=c["outline"])
 
     # Head (skin)
-    d.rectangle([5,0,size-6,6], fill=skin, outline=outline)
+    d.rectangle([5,0,size-6,6], fill=c["skin"], outline=c["outline"])
 
     # Eyes
-    d.point((6,2), fill=eye)
-    d.point((size-7,2), fill=eye)
+    d.point((6,2), fill=c["eye"])
+    d.point((size-7,2), fill=c["eye"])
 
     # Hair (random style)
-    style = random.choice(["short","long","mohawk"])
     if style == "short":
-        d.rectangle([5,-1,size-6,2], fill=hair)  # top row
+        d.rectangle([5,-1,size-6,2], fill=c["hair"])  # top row
     elif style == "long":
-        d.rectangle([4,0,size-5,4], fill=hair)
-        d.rectangle([4,0,4,6], fill=hair)  # sideburns
-        d.rectangle([size-5,0,size-5,6], fill=hair)
+        d.rectangle([4,0,size-5,4], fill=c["hair"])
+        d.rectangle([4,0,4,6], fill=c["hair"])  # sideburns
+        d.rectangle([size-5,0,size-5,6], fill=c["hair"])
     elif style == "mohawk":
-        d.rectangle([7,-1,8,3], fill=hair)
+        d.rectangle([7,-1,8,3], fill=c["hair"])
 
     # Arms (shirt color)
-    d.rectangle([3,7,4,11], fill=shirt, outline=outline)
-    d.rectangle([size-5,7,size-4,11], fill=shirt, outline=outline)
+    d.rectangle([3,7,4,11], fill=c["shirt"], outline=c["outline"])
+    d.rectangle([size-5,7,size-4,11], fill=c["shirt"], outline=c["outline"])
 
     # Pants
-    d.rectangle([4,11,size-5,14], fill=pants, outline=outline)
+    d.rectangle([4,11,size-5,14], fill=c["pants"], outline=c["outline"])
 
     # Legs
-    d.rectangle([6,size-6,7,size-2], fill=pants, outline=outline)
-    d.rectangle([size-8,size-6,size-7,size-2], fill=pants, outline=outline)
+    d.rectangle([6,size-6,7,size-2], fill=c["pants"], outline=c["outline"])
+    d.rectangle([size-8,size-6,size-7,size-2], fill=c["pants"], outline=c["outline"])
 
     # Shoes
-    d.rectangle([6,size-3,7,size-2], fill=shoes, outline=outline)
-    d.rectangle([size-8,size-3,size-7,size-2], fill=shoes, outline=outline)
+    d.rectangle([6,size-3,7,size-2], fill=c["shoes"], outline=c["outline"])
+    d.rectangle([size-8,size-3,size-7,size-2], fill=c["shoes"], outline=c["outline"])
 
-    return img
+def make_detailed_sprite(size=16, rng=random):
+    """Return a detailed humanoid base sprite with clothing, hair, and shoes."""
+    colors, style = random_character(rng)
+    return recolor(base_template(style, size), colors).convert("RGBA")
 
-def animate_sprite(base, col, row):
+def animate_sprite(base, col, row, clear=(0,0,0,0), step=(0,0,0)):
     """Modify base sprite slightly depending on frame col and direction row."""
     frame = base.copy()
     d = ImageDraw.Draw(frame)
@@ -62,34 +84,171 @@ def animate_sprite(base, col, row):
 
     # Animate legs
     if col == 0: # left step
-        d.rectangle([6,h-6,7,h-2], fill=(0,0,0,0)) # clear
-        d.rectangle([5,h-7,6,h-3], fill=(0,0,0))   # step
+        d.rectangle([6,h-6,7,h-2], fill=clear) # clear
+        d.rectangle([5,h-7,6,h-3], fill=step)   # step
     elif col == 2: # right step
-        d.rectangle([w-8,h-6,w-7,h-2], fill=(0,0,0,0))
-        d.rectangle([w-9,h-7,w-8,h-3], fill=(0,0,0))
+        d.rectangle([w-8,h-6,w-7,h-2], fill=clear)
+        d.rectangle([w-9,h-7,w-8,h-3], fill=step)
 
     # Animate arms
     if col == 0:
-        d.rectangle([3,7,4,11], fill=(0,0,0,0)) # hide left arm
+        d.rectangle([3,7,4,11], fill=clear) # hide left arm
     elif col == 2:
-        d.rectangle([w-5,7,w-4,11], fill=(0,0,0,0)) # hide right arm
+        d.rectangle([w-5,7,w-4,11], fill=clear) # hide right arm
 
     return frame
 
-def generate_sheet(size=16, scale=4):
-    base = make_detailed_sprite(size)
-    w,h = base.size
-    sheet = Image.new("RGBA", (w*3, h*4), (0,0,0,0))
-
-    for row in range(4): # down,left,right,up
-        for col in range(3): # stepL,idle,stepR
-            frame = animate_sprite(base, col, row)
-            sheet.paste(frame, (col*w,row*h))
+# ---------------------------
+# Palette templates
+# ---------------------------
+
+_BASES = {}
+_SHEETS = {}
+
+def base_template(style, size=16):
+    """The unanimated figure as slot indices."""
+    key = (style, size)
+    if key not in _BASES:
+        img = Image.new("P", (size, size), TRANSPARENT)
+        slots = {name: i for i, name in enumerate(SLOTS)}
+        draw_figure(ImageDraw.Draw(img), size, slots, style)
+        _BASES[key] = img
+    return _BASES[key]
+
+def template_sheet(style, size=16, scale=4):
+    """The 3x4 walk-cycle sheet as slot indices, scaled for the game."""
+    key = (style, size, scale)
+    if key not in _SHEETS:
+        base = base_template(style, size)
+        w,h = base.size
+        sheet = Image.new("P", (w*3, h*4), TRANSPARENT)
+        for row in range(4): # down,left,right,up
+            for col in range(3): # stepL,idle,stepR
+                frame = animate_sprite(base, col, row, clear=TRANSPARENT, step=OUTLINE)
+                sheet.paste(frame, (col*w,row*h))
+        _SHEETS[key] = sheet.resize((w*3*scale,h*4*scale), Image.NEAREST)
+    return _SHEETS[key]
+
+def recolor(template, colors):
+    """A copy of `template` with the character's colours in its palette."""
+    img = template.copy()
+    palette = [0,0,0]
+    for name in SLOTS[1:]:
+        palette += colors[name]
+    img.putpalette(palette)
+    img.info["transparency"] = TRANSPARENT
+    return img
 
-    # Scale up for game
-    sheet = sheet.resize((w*3*scale,h*4*scale), Image.NEAREST)
-    sheet.save("character_sheet.png")
-    print("✅ Saved character_sheet.png")
+def generate_sheet(size=16, scale=4, atlas=None, name="character", path="character_sheet.png", rng=random):
+    """Save the character's sheet to `path`, or add the 12 scaled frames
+    to a SpriteAtlas (sprite_atlas.py) as name_<direction>_<frame>."""
+    colors, style = random_character(rng)
+    sheet = recolor(template_sheet(style, size, scale), colors)
+    if atlas is not None:
+        w, h = size*scale, size*scale
+        rgba = sheet.convert("RGBA")
+        for row in range(4):
+            for col in range(3):
+                frame = rgba.crop((col*w, row*h, (col+1)*w, (row+1)*h))
+                atlas.add(f"{name}_{ROWS[row]}_{col}", frame, direction=ROWS[row], frame=col,
+                          style=style, **colors)
+        return
+    sheet.save(path)
+    print(f"✅ Saved {path}")
+
+# ---------------------------
+# Crowds (numpy)
+# ---------------------------
+# A crowd is a (N, len(CROWD_FIELDS)) trait array of indices into
+# HAIR_STYLES and TRAIT_COLORS. Its sheets are gathered in one step from
+# the slot-index frames of each style through a per-character palette,
+# so a character costs its 16x16 frames and nothing else.
+
+CROWD_FIELDS = ["style"] + list(TRAIT_COLORS)
+_FRAMES = {}
+
+def template_frames(size=16):
+    """(styles, rows, cols, size, size) uint8 slot indices of every frame."""
+    if size not in _FRAMES:
+        _FRAMES[size] = np.array([[[np.asarray(animate_sprite(base_template(style, size), col, row,
+                                                             clear=TRANSPARENT, step=OUTLINE))
+                                    for col in range(3)] for row in range(4)]
+                                  for style in HAIR_STYLES], dtype=np.uint8)
+    return _FRAMES[size]
+
+def random_crowd_traits(n, rng=None):
+    rng = rng or np.random.default_rng()
+    sizes = [len(HAIR_STYLES)] + [len(c) for c in TRAIT_COLORS.values()]
+    return np.stack([rng.integers(0, k, n) for k in sizes], axis=1)
+
+def crowd_palettes(traits):
+    """(N, slots, 4) RGBA palette of each character; slot 0 is clear."""
+    palettes = np.zeros((len(traits), len(SLOTS), 4), np.uint8)
+    palettes[:, 1:, 3] = 255
+    for name, color in FIXED_COLORS.items():
+        palettes[:, SLOTS.index(name), :3] = color
+    for i, (name, choices) in enumerate(TRAIT_COLORS.items(), 1):
+        palettes[:, SLOTS.index(name), :3] = np.array(choices, np.uint8)[traits[:, i]]
+    return palettes
+
+def generate_crowd(n, size=16, rng=None, traits=None):
+    """(sheets, traits): sheets is (N, rows, cols, size, size, 4) uint8."""
+    if traits is None:
+        traits = random_crowd_traits(n, rng)
+    frames = template_frames(size)
+    # Palette entries as packed RGBA words, so each pixel is one gather
+    words = crowd_palettes(traits).view(np.uint32).reshape(len(traits), len(SLOTS))
+    sheets = np.empty((len(traits),) + frames.shape[1:], np.uint32)
+    for style, slots in enumerate(frames):
+        members = np.nonzero(traits[:, 0] == style)[0]
+        sheets[members] = words[members][:, slots]
+    return sheets.view(np.uint8).reshape(sheets.shape + (4,)), traits
+
+def upscale(frames, scale):
+    """Nearest-neighbour integer upscale of (..., h, w, 4) frames."""
+    return frames.repeat(scale, axis=-3).repeat(scale, axis=-2)
+
+def sheet_image(sheet, scale=4):
+    """One (rows, cols, size, size, 4) sheet as the RGBA sheet image."""
+    rows, cols, h, w, _ = sheet.shape
+    grid = sheet.transpose(0, 2, 1, 3, 4).reshape(rows * h, cols * w, 4)
+    return Image.fromarray(upscale(grid, scale), "RGBA")
+
+def traits_dict(row):
+    colors = {name: choices[row[i]] for i, (name, choices) in enumerate(TRAIT_COLORS.items(), 1)}
+    return colors, HAIR_STYLES[row[0]]
+
+def write_crowd(traits, outdir=None, atlas=None, size=16, scale=4, prefix="character"):
+    """Write row i of a trait array to outdir/<prefix>_<i + 1>_sheet.png
+    by palette swap, or add its frames to a SpriteAtlas."""
+    if atlas is None:
+        os.makedirs(outdir, exist_ok=True)
+    else:
+        sheets, _ = generate_crowd(len(traits), size, traits=traits)
+        sheets = upscale(sheets, scale)
+    for i, row in enumerate(traits):
+        colors, style = traits_dict(row)
+        name = f"{prefix}_{i + 1}"
+        if atlas is None:
+            colors.update(FIXED_COLORS)
+            recolor(template_sheet(style, size, scale), colors).save(os.path.join(outdir, name + "_sheet.png"))
+            continue
+        for r in range(4):
+            for c in range(3):
+                atlas.add(f"{name}_{ROWS[r]}_{c}", Image.fromarray(sheets[i, r, c], "RGBA"),
+                          direction=ROWS[r], frame=c, style=style, **colors)
 
 if __name__=="__main__":
-    generate_sheet()
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--count", type=int, default=1, help="Number of character sheets")
+    parser.add_argument("--outdir", type=str, default=".", help="Output folder for --count > 1")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    if args.count == 1:
+        generate_sheet()
+    else:
+        traits = random_crowd_traits(args.count, np.random.default_rng(args.seed))
+        write_crowd(traits, args.outdir)
+        print(f"✅ Saved {args.count} sheets to {args.outdir}")
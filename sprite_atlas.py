@@ -0,0 +1,138 @@
+"""
+Sprite atlas packer
+
+Packs many small sprites into a few power-of-two RGBA textures and
+writes a JSON index beside them (name, rect, traits, direction, frame),
+so a game loads one texture instead of thousands of tiny PNGs.
+
+Usage:
+  python sprite_atlas.py [--out atlas] [--characters 16] [--seed 1] [--max-size 2048]
+
+Builds one atlas from the mirrored car set, the muscle car and
+--characters walk-cycle sheets.
+"""
+import argparse
+import json
+import os
+import random
+from PIL import Image
+
+import assetgen
+
+def next_pow2(n):
+    return 1 << max(0, int(n) - 1).bit_length()
+
+def shelf_pack(sizes, width, height, padding=1):
+    """Place (w, h) boxes tallest first on shelves inside width x height.
+
+    Returns {index: (x, y)} for the boxes that fit; a box that does not
+    fit is skipped and later (smaller) ones are still tried.
+    """
+    order = sorted(range(len(sizes)), key=lambda i: (-sizes[i][1], -sizes[i][0]))
+    placed = {}
+    x = y = shelf = 0
+    for i in order:
+        w, h = sizes[i]
+        if x + w > width:
+            if y + shelf + h > height:
+                continue
+            x, y, shelf = 0, y + shelf, 0
+        if y + h > height or x + w > width:
+            continue
+        placed[i] = (x, y)
+        x += w + padding
+        shelf = max(shelf, h + padding)
+    return placed
+
+class SpriteAtlas:
+    """Collects sprites, then packs and saves them as atlas pages.
+
+    Each page is the smallest power-of-two texture (up to max_size on a
+    side) that holds what is left; sprites that do not fit go on the
+    next page.
+    """
+    def __init__(self, max_size=2048, padding=1):
+        self.max_size = max_size
+        self.padding = padding
+        self.sprites = []
+        self.names = set()
+
+    def add(self, name, image, direction=None, frame=None, **traits):
+        if name in self.names:
+            raise ValueError(f"duplicate sprite name {name!r}")
+        if max(image.size) > self.max_size:
+            raise ValueError(f"{name!r} is larger than a {self.max_size}px page")
+        self.names.add(name)
+        self.sprites.append({"name": name, "image": image.convert("RGBA"),
+                             "direction": direction, "frame": frame, "traits": traits})
+
+    def pack(self):
+        """[(page size, [(sprite, x, y), ...]), ...]"""
+        pages = []
+        remaining = list(self.sprites)
+        while remaining:
+            sizes = [s["image"].size for s in remaining]
+            area = sum((w + self.padding) * (h + self.padding) for w, h in sizes)
+            side = min(self.max_size, next_pow2(max(area ** 0.5, *(max(s) for s in sizes))))
+            while True:
+                placed = shelf_pack(sizes, side, side, self.padding)
+                if len(placed) == len(sizes) or side >= self.max_size:
+                    break
+                side *= 2
+            # Trim the unused bottom of the page to the next power of two
+            used = max(y + sizes[i][1] for i, (x, y) in placed.items())
+            page = (side, min(side, next_pow2(used)))
+            pages.append((page, [(remaining[i], x, y) for i, (x, y) in placed.items()]))
+            remaining = [s for i, s in enumerate(remaining) if i not in placed]
+        return pages
+
+    def save(self, prefix):
+        """Write prefix_0.png, prefix_1.png, ... and prefix.json; returns
+        the JSON path."""
+        os.makedirs(os.path.dirname(os.path.abspath(prefix)), exist_ok=True)
+        index = {"textures": [], "sprites": []}
+        for n, (size, placed) in enumerate(self.pack()):
+            texture = Image.new("RGBA", size, (0, 0, 0, 0))
+            file = f"{os.path.basename(prefix)}_{n}.png"
+            for sprite, x, y in placed:
+                texture.paste(sprite["image"], (x, y))
+                w, h = sprite["image"].size
+                index["sprites"].append({
+                    "name": sprite["name"], "texture": n, "rect": [x, y, w, h],
+                    "direction": sprite["direction"], "frame": sprite["frame"],
+                    "traits": sprite["traits"],
+                })
+            texture.save(os.path.join(os.path.dirname(prefix), file), "PNG", optimize=True)
+            index["textures"].append({"file": file, "size": list(size)})
+        index["sprites"].sort(key=lambda s: s["name"])
+        path = prefix + ".json"
+        with open(path, "w") as f:
+            json.dump(index, f, separators=(",", ":"))
+        return path
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", type=str, default="atlas", help="Output prefix (writes <out>_N.png and <out>.json)")
+    parser.add_argument("--characters", type=int, default=16, help="Character sheets to include")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed for reproducibility")
+    parser.add_argument("--max-size", type=int, default=2048, help="Largest texture side")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    atlas = SpriteAtlas(max_size=args.max_size)
+
+    cars = assetgen.script("cars")
+    cars.write_car_set(cars.variant_specs(), None, atlas=atlas)
+
+    muscle = assetgen.script("muscle_car")
+    atlas.add("muscle_car", muscle.generate_muscle_car(), direction="right", frame=0)
+
+    characters = assetgen.script("characters")
+    for i in range(args.characters):
+        characters.generate_sheet(atlas=atlas, name=f"character_{i + 1}")
+
+    path = atlas.save(args.out)
+    print(f"{len(atlas.sprites)} sprites packed into {path}")
+
+if __name__ == "__main__":
+    main()
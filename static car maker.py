@@ -43,11 +43,12 @@ def generate_muscle_car():
 
     return image
 
-# Generate the muscle car image
-muscle_car_image = generate_muscle_car()
+if __name__ == "__main__":
+    # Generate the muscle car image
+    muscle_car_image = generate_muscle_car()
 
-# Show the image
-muscle_car_image.show()
+    # Show the image
+    muscle_car_image.show()
 
-# Optionally save the image
-muscle_car_image.save("muscle_car_with_rims.png")
\ No newline at end of file
+    # Optionally save the image
+    muscle_car_image.save("muscle_car_with_rims.png")
\ No newline at end of file
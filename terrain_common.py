@@ -0,0 +1,40 @@
+"""
+Shared terrain helpers
+
+What Desert.py and Grassy land.py have in common: drawing feature
+lists with ImageDraw (optionally wrapped around a tile), scaling
+feature counts with area, and saving a texture with or without its
+mipmap chain. Plain PIL, so the scripts keep working without numpy.
+"""
+
+def feature_count(per_patch, size, density=1.0):
+    """Features for a w x h image at `per_patch` features per 100x100 px."""
+    return int(round(per_patch * density * size[0] * size[1] / 10000))
+
+def sampled_count(per_patch, size, density, rng):
+    """feature_count, with a fractional count's last feature kept with that
+    probability (drawn from `rng`), so small patches such as terrain
+    chunks keep the density on average instead of rounding it away."""
+    n = per_patch * density * size[0] * size[1] / 10000
+    whole = int(n)
+    return whole + 1 if n > whole and rng.random() < n - whole else whole
+
+def draw_features(draw, features, dx=0, dy=0, wrap=None):
+    """Draw (shape, coords, options) features shifted by (dx, dy). With
+    wrap=(w, h) each one is also drawn a tile away in every direction, so
+    a feature crossing an edge comes back on the opposite side."""
+    offsets = [(0, 0)]
+    if wrap:
+        offsets = [(ox, oy) for oy in (-wrap[1], 0, wrap[1]) for ox in (-wrap[0], 0, wrap[0])]
+    for shape, coords, options in features:
+        for ox, oy in offsets:
+            shifted = [v + (dy + oy if i % 2 else dx + ox) for i, v in enumerate(coords)]
+            getattr(draw, shape)(shifted, **options)
+
+def save_texture(img, filename, wrap=False, mipmaps=None):
+    """Save img, or with mipmaps="box"/"lanczos" its mipmap chain (mipmap.py)."""
+    if mipmaps:
+        from mipmap import save_mipmaps
+        save_mipmaps(img, filename, mipmaps, wrap)
+    else:
+        img.save(filename)
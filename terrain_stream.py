@@ -0,0 +1,146 @@
+"""
+Terrain streaming
+
+Generates desert or grass ground chunk by chunk, on demand, for maps of
+any size. A chunk is a pure function of the world seed and its (cx, cy)
+coordinates, so chunks can be produced in any order, dropped and
+regenerated, and always line up.
+
+Usage:
+  python terrain_stream.py [--kind desert] [--seed 1] [--region 0,0,1280,720] [--out terrain.png]
+
+Each chunk owns the features (pebbles, rocks, lines, blades) whose
+anchor falls inside it, drawn from its own random.Random. A feature may
+reach into nearby chunks (up to the terrain's REACH px past its anchor),
+so a chunk is drawn from the features of every chunk that close (3x3 at
+the default size), layer by layer and in world order (row, then column,
+then feature), which every chunk sharing the feature agrees on.
+"""
+import argparse
+import functools
+import math
+import random
+from collections import OrderedDict
+from PIL import Image, ImageDraw
+
+import assetgen
+
+@functools.lru_cache(maxsize=None)
+def terrain_kind(kind):
+    """(module, feature function) for "desert" or "grass"."""
+    if kind == "desert":
+        module = assetgen.script("desert")
+        return module, module.desert_features
+    if kind == "grass":
+        module = assetgen.script("grass")
+        return module, module.grass_features
+    raise ValueError(f"unknown terrain {kind!r}")
+
+def chunk_rng(seed, kind, cx, cy):
+    # String seeds are hashed with SHA-512, so this is stable across runs
+    # and platforms (unlike hash() of a tuple)
+    return random.Random(f"{seed}:{kind}:{cx}:{cy}")
+
+@functools.lru_cache(maxsize=1024)
+def chunk_features(kind, seed, chunk, cx, cy):
+    _, features = terrain_kind(kind)
+    # Counts scale with the chunk's area, so the map looks the same at any chunk size
+    return features(chunk_rng(seed, kind, cx, cy), chunk, chunk, density=1.0)
+
+class ChunkCache:
+    """Least-recently-used chunk images, bounded by total bytes."""
+    def __init__(self, max_bytes=64 * 2**20):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.items = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, build):
+        if key in self.items:
+            self.hits += 1
+            self.items.move_to_end(key)
+            return self.items[key]
+        self.misses += 1
+        value = build()
+        size = value.width * value.height * len(value.getbands())
+        self.items[key] = value
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self.items) > 1:
+            _, old = self.items.popitem(last=False)
+            self.bytes -= old.width * old.height * len(old.getbands())
+            self.evictions += 1
+        return value
+
+    def stats(self):
+        return {"chunks": len(self.items), "bytes": self.bytes, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions}
+
+class Terrain:
+    """An endless desert or grass map cut into chunk x chunk tiles."""
+    def __init__(self, kind="desert", seed=0, chunk=100, cache_bytes=64 * 2**20):
+        if chunk < 32:
+            raise ValueError("chunks must be at least 32px")
+        self.module, _ = terrain_kind(kind)
+        # Rings of neighbouring chunks whose features can reach this one
+        self.reach = math.ceil(self.module.REACH / chunk)
+        self.kind = kind
+        self.seed = seed
+        self.chunk = chunk
+        self.cache = ChunkCache(cache_bytes)
+
+    def features(self, cx, cy):
+        return chunk_features(self.kind, self.seed, self.chunk, cx, cy)
+
+    def render_chunk(self, cx, cy):
+        img = Image.new("RGB", (self.chunk, self.chunk), self.module.BASE_COLOR)
+        draw = ImageDraw.Draw(img)
+        near = range(-self.reach, self.reach + 1)
+        for layer in self.module.LAYERS:
+            for dy in near:
+                for dx in near:
+                    features = self.features(cx + dx, cy + dy)[layer]
+                    self.module.draw_features(draw, features, dx * self.chunk, dy * self.chunk)
+        return img
+
+    def chunk_image(self, cx, cy):
+        return self.cache.get((cx, cy), lambda: self.render_chunk(cx, cy))
+
+    def visible(self, x, y, w, h, margin=0):
+        """(cx, cy) of every chunk overlapping the world rect, plus
+        `margin` rings of chunks around it, row by row."""
+        c = self.chunk
+        x0, y0 = x // c - margin, y // c - margin
+        x1, y1 = (x + w - 1) // c + margin, (y + h - 1) // c + margin
+        return [(cx, cy) for cy in range(y0, y1 + 1) for cx in range(x0, x1 + 1)]
+
+    def stream(self, path, view, margin=1):
+        """For each viewport top-left (x, y) in `path`, yield
+        (x, y, {(cx, cy): image}) for the chunks around it. Only chunks
+        near the viewport are ever built; old ones age out of the cache."""
+        w, h = view
+        for x, y in path:
+            yield x, y, {key: self.chunk_image(*key) for key in self.visible(x, y, w, h, margin)}
+
+    def render_region(self, x, y, w, h):
+        """Stitch the world rect (x, y, w, h) into one image."""
+        out = Image.new("RGB", (w, h))
+        for cx, cy in self.visible(x, y, w, h):
+            out.paste(self.chunk_image(cx, cy), (cx * self.chunk - x, cy * self.chunk - y))
+        return out
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--kind", choices=["desert", "grass"], default="desert", help="Terrain type")
+    parser.add_argument("--seed", type=int, default=0, help="World seed")
+    parser.add_argument("--chunk", type=int, default=100, help="Chunk size (pixels)")
+    parser.add_argument("--region", type=str, default="0,0,1280,720", help="World rect x,y,w,h to render")
+    parser.add_argument("--out", type=str, default="terrain.png", help="Output file")
+    args = parser.parse_args()
+
+    x, y, w, h = (int(v) for v in args.region.split(","))
+    terrain = Terrain(args.kind, args.seed, args.chunk)
+    terrain.render_region(x, y, w, h).save(args.out)
+    print(f"Saved {args.out} ({terrain.cache.stats()['misses']} chunks)")
+
+if __name__ == "__main__":
+    main()